@@ -4,48 +4,118 @@ Handles Prometheus integration, metric collection, anomaly detection, and health
 """
 
 from flask import Flask, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.ensemble import IsolationForest
 from pyod.models.ecod import ECOD
 import requests
-from typing import Dict, List, Any
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Union
 import sqlite3
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 import threading
 import time
+import os
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for faster response encoding"""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
-# Database setup
-DB_PATH = 'monitoring.db'
+# Database setup (DB_PATH points the API and collector processes at a shared file)
+DB_PATH = os.environ.get('DB_PATH', 'monitoring.db')
+
+# Shared writer connection. Autocommit mode, so multi-row writes open an
+# explicit BEGIN and commit once via the connection context manager.
+DB = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+DB.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+''')
+DB_LOCK = threading.Lock()
+
+# Per-thread read connections, opened on first use and kept for the thread's
+# lifetime so each keeps its page cache warm. WAL mode is a property of the
+# database file, so readers never block on the writer above.
+_local = threading.local()
+
+def get_conn() -> sqlite3.Connection:
+    """Return the calling thread's cached read connection"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn.execute('PRAGMA cache_size=-131072')
+        _local.conn = conn
+    return conn
+
+# service_metrics timestamps are Unix epoch seconds (local wall clock, as
+# produced by datetime.timestamp()) so range filters compare integers
+SERVICE_METRICS_DDL = '''
+    CREATE TABLE {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        service_name TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        request_rate REAL,
+        error_rate REAL,
+        latency_p50 REAL,
+        latency_p95 REAL,
+        latency_p99 REAL,
+        cpu_usage REAL,
+        memory_usage REAL,
+        restart_count INTEGER,
+        pod_count INTEGER,
+        UNIQUE(service_name, timestamp)
+    )
+'''
+
+def _migrate_epoch_timestamps(cursor):
+    """Rebuild a legacy service_metrics table that stored ISO-8601 timestamps"""
+    columns = {row[1]: row[2] for row in cursor.execute('PRAGMA table_info(service_metrics)')}
+    if columns.get('timestamp', '').upper() == 'INTEGER':
+        return
+    
+    print("Migrating service_metrics timestamps to epoch seconds...")
+    cursor.execute('BEGIN')
+    cursor.execute('ALTER TABLE service_metrics RENAME TO service_metrics_legacy')
+    cursor.execute(SERVICE_METRICS_DDL.format(table='service_metrics'))
+    # 'utc' treats the stored naive timestamps as local time, matching
+    # datetime.timestamp(); rows already holding epoch values are kept as-is
+    cursor.execute('''
+        INSERT OR IGNORE INTO service_metrics
+        SELECT id, service_name,
+               CASE
+                   WHEN typeof(timestamp) = 'integer' THEN timestamp
+                   WHEN timestamp NOT GLOB '*[^0-9]*' THEN CAST(timestamp AS INTEGER)
+                   ELSE CAST(strftime('%s', timestamp, 'utc') AS INTEGER)
+               END,
+               request_rate, error_rate, latency_p50, latency_p95, latency_p99,
+               cpu_usage, memory_usage, restart_count, pod_count
+        FROM service_metrics_legacy
+    ''')
+    cursor.execute('DROP TABLE service_metrics_legacy')
+    cursor.execute('COMMIT')
 
 def init_db():
     """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = DB.cursor()
     
     # Service metrics table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS service_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            service_name TEXT NOT NULL,
-            timestamp DATETIME NOT NULL,
-            request_rate REAL,
-            error_rate REAL,
-            latency_p50 REAL,
-            latency_p95 REAL,
-            latency_p99 REAL,
-            cpu_usage REAL,
-            memory_usage REAL,
-            restart_count INTEGER,
-            pod_count INTEGER,
-            UNIQUE(service_name, timestamp)
-        )
-    ''')
+    cursor.execute(SERVICE_METRICS_DDL.format(table='IF NOT EXISTS service_metrics'))
+    _migrate_epoch_timestamps(cursor)
     
     # Metrics anomaly records
     cursor.execute('''
@@ -74,16 +144,62 @@ def init_db():
         )
     ''')
     
-    conn.commit()
-    conn.close()
+    # service_metrics is already covered by its UNIQUE(service_name, timestamp)
+    # index; anomalies need their own for the per-service and time-window reads
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ma_svc_ts
+        ON metrics_anomalies(service_name, timestamp)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ma_ts
+        ON metrics_anomalies(timestamp)
+    ''')
+    # service_name lookups use the UNIQUE index; this covers per-type recency reads
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_services_type_seen
+        ON services(service_type, last_seen)
+    ''')
 
 init_db()
 
+# Demo services the collector queries out of the box
+DEMO_SERVICES = ['api-gateway', 'user-service', 'payment-service', 'notification-service']
+
+def seed_demo_services():
+    """Register the demo services if they aren't registered yet"""
+    now = datetime.now().isoformat()
+    with DB_LOCK, DB:
+        DB.execute('BEGIN')
+        DB.executemany('INSERT OR IGNORE INTO services (service_name, service_type, last_seen) VALUES (?, ?, ?)',
+                       [(svc, 'microservice', now) for svc in DEMO_SERVICES])
+
+# Runs on import, so gunicorn workers (wsgi.py), collector.py and the dev
+# server all start with the demo services registered
+seed_demo_services()
+
 # Configuration
-PROMETHEUS_URL = "http://localhost:9090"
+PROMETHEUS_URL = os.environ.get('PROMETHEUS_URL', 'http://localhost:9090')
 METRIC_WINDOW_MINUTES = 5
 ANOMALY_THRESHOLD = 0.7
 
+# PromQL templates per ServiceMetrics field, filled with .format(s=service_name)
+QUERIES = (
+    # Request and error rate
+    ('request_rate', 'rate(http_requests_total{{service="{s}"}}[5m])'),
+    ('error_rate', 'rate(http_requests_total{{service="{s}",status=~"5.."}}[5m])'),
+    # Latency percentiles
+    ('latency_p50', 'histogram_quantile(0.5, rate(http_request_duration_seconds_bucket{{service="{s}"}}[5m]))'),
+    ('latency_p95', 'histogram_quantile(0.95, rate(http_request_duration_seconds_bucket{{service="{s}"}}[5m]))'),
+    ('latency_p99', 'histogram_quantile(0.99, rate(http_request_duration_seconds_bucket{{service="{s}"}}[5m]))'),
+    # CPU and Memory
+    ('cpu_usage', 'rate(container_cpu_usage_seconds_total{{service="{s}"}}[5m])'),
+    ('memory_usage', 'container_memory_usage_bytes{{service="{s}"}}'),
+    # Restarts and pod count
+    ('restart_count', 'kube_pod_container_status_restarts_total{{service="{s}"}}'),
+    ('pod_count', 'count(kube_pod_info{{service="{s}"}})'),
+)
+QUERY_NAMES = [name for name, _ in QUERIES]
+
 @dataclass
 class ServiceMetrics:
     service_name: str
@@ -98,20 +214,80 @@ class ServiceMetrics:
     restart_count: int
     pod_count: int
 
+# service_metrics columns that make up a ServiceMetrics, in field order
+METRIC_FIELDS = [field.name for field in fields(ServiceMetrics)]
+METRIC_COLUMNS = ', '.join(METRIC_FIELDS)
+
+def _row_to_metrics(row: sqlite3.Row) -> ServiceMetrics:
+    """Build ServiceMetrics from a service_metrics row selected by name"""
+    values = {name: row[name] for name in METRIC_FIELDS}
+    values['timestamp'] = datetime.fromtimestamp(values['timestamp'])
+    return ServiceMetrics(**values)
+
+# Latest stored metrics per service. store_metrics keeps this current so the
+# health summary is served from memory instead of querying SQLite. Web workers
+# don't run the collector themselves, so they reload it every LATEST_TTL_SECONDS.
+LATEST: Dict[str, ServiceMetrics] = {}
+LATEST_LOCK = threading.RLock()
+LATEST_TTL_SECONDS = 15
+_latest_loaded_at = 0.0
+
+def load_latest_metrics():
+    """Seed LATEST from the newest stored row of every service"""
+    cursor = get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
+    # With a bare MAX() aggregate SQLite fills the other columns from the
+    # max row, so one walk of the (service_name, timestamp) index suffices
+    cursor.execute(f'''
+        SELECT {METRIC_COLUMNS}, MAX(timestamp) FROM service_metrics
+        GROUP BY service_name
+    ''')
+    rows = cursor.fetchall()
+    latest = {row['service_name']: _row_to_metrics(row) for row in rows}
+    
+    # The query runs unlocked; readers only wait for the swap itself
+    global LATEST, _latest_loaded_at
+    with LATEST_LOCK:
+        # Keep anything store_metrics wrote while the query was running
+        for service_name, loaded in latest.items():
+            current = LATEST.get(service_name)
+            if current is not None and current.timestamp > loaded.timestamp:
+                latest[service_name] = current
+        LATEST = latest
+        _latest_loaded_at = time.monotonic()
+
+def refresh_latest_metrics():
+    """Reload LATEST once it is older than LATEST_TTL_SECONDS"""
+    global _latest_loaded_at
+    with LATEST_LOCK:
+        if time.monotonic() - _latest_loaded_at < LATEST_TTL_SECONDS:
+            return
+        # Claim this reload so concurrent requests keep serving the current map
+        _latest_loaded_at = time.monotonic()
+    load_latest_metrics()
+
+load_latest_metrics()
+
 class PrometheusClient:
     """Client for querying Prometheus metrics"""
     
     def __init__(self, base_url: str):
         self.base_url = base_url
+        
+        # Keep-alive session so repeated queries reuse pooled connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def query(self, query: str) -> Dict:
         """Execute Prometheus query"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/api/v1/query",
                 params={'query': query}
             )
-            return response.json()
+            return orjson.loads(response.content)
         except Exception as e:
             print(f"Prometheus query failed: {e}")
             return {'status': 'error', 'data': {'result': []}}
@@ -119,7 +295,7 @@ class PrometheusClient:
     def query_range(self, query: str, start: datetime, end: datetime, step: str = '1m') -> Dict:
         """Execute Prometheus range query"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/api/v1/query_range",
                 params={
                     'query': query,
@@ -128,7 +304,7 @@ class PrometheusClient:
                     'step': step
                 }
             )
-            return response.json()
+            return orjson.loads(response.content)
         except Exception as e:
             print(f"Prometheus range query failed: {e}")
             return {'status': 'error', 'data': {'result': []}}
@@ -136,55 +312,43 @@ class PrometheusClient:
 class MetricsCollector:
     """Collects and stores metrics from Prometheus"""
     
-    def __init__(self, prometheus_client: PrometheusClient):
+    def __init__(self, prometheus_client: PrometheusClient, max_workers: int = 32):
         self.prom = prometheus_client
+        # Shared pool sized to the session's connection pool, so every
+        # in-flight query (across all services) has a connection to use
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
     
     def collect_service_metrics(self, service_name: str) -> ServiceMetrics:
         """Collect all metrics for a service"""
-        
-        # Request rate
-        req_rate_query = f'rate(http_requests_total{{service="{service_name}"}}[5m])'
-        req_rate = self._extract_value(self.prom.query(req_rate_query))
-        
-        # Error rate
-        error_rate_query = f'rate(http_requests_total{{service="{service_name}",status=~"5.."}}[5m])'
-        error_rate = self._extract_value(self.prom.query(error_rate_query))
-        
-        # Latency percentiles
-        p50_query = f'histogram_quantile(0.5, rate(http_request_duration_seconds_bucket{{service="{service_name}"}}[5m]))'
-        p95_query = f'histogram_quantile(0.95, rate(http_request_duration_seconds_bucket{{service="{service_name}"}}[5m]))'
-        p99_query = f'histogram_quantile(0.99, rate(http_request_duration_seconds_bucket{{service="{service_name}"}}[5m]))'
-        
-        latency_p50 = self._extract_value(self.prom.query(p50_query))
-        latency_p95 = self._extract_value(self.prom.query(p95_query))
-        latency_p99 = self._extract_value(self.prom.query(p99_query))
-        
-        # CPU and Memory
-        cpu_query = f'rate(container_cpu_usage_seconds_total{{service="{service_name}"}}[5m])'
-        mem_query = f'container_memory_usage_bytes{{service="{service_name}"}}'
-        
-        cpu_usage = self._extract_value(self.prom.query(cpu_query))
-        memory_usage = self._extract_value(self.prom.query(mem_query))
-        
-        # Restarts and pod count
-        restart_query = f'kube_pod_container_status_restarts_total{{service="{service_name}"}}'
-        pod_count_query = f'count(kube_pod_info{{service="{service_name}"}})'
-        
-        restart_count = int(self._extract_value(self.prom.query(restart_query)))
-        pod_count = int(self._extract_value(self.prom.query(pod_count_query)))
+        return self._build_metrics(service_name, self._submit_queries(service_name))
+    
+    def collect_all(self, service_names: List[str]) -> List[ServiceMetrics]:
+        """Collect metrics for several services with all queries in flight at once"""
+        pending = [(service_name, self._submit_queries(service_name)) for service_name in service_names]
+        return [self._build_metrics(service_name, futures) for service_name, futures in pending]
+    
+    def _submit_queries(self, service_name: str) -> List:
+        """Fan a service's queries out in parallel over the pooled session"""
+        return [self.executor.submit(self.prom.query, template.format(s=service_name))
+                for _, template in QUERIES]
+    
+    def _build_metrics(self, service_name: str, futures: List) -> ServiceMetrics:
+        """Wait for a service's query futures and assemble its ServiceMetrics"""
+        results = dict(zip(QUERY_NAMES, (self._extract_value(f.result()) for f in futures)))
         
         return ServiceMetrics(
             service_name=service_name,
-            timestamp=datetime.now(),
-            request_rate=req_rate,
-            error_rate=error_rate,
-            latency_p50=latency_p50,
-            latency_p95=latency_p95,
-            latency_p99=latency_p99,
-            cpu_usage=cpu_usage,
-            memory_usage=memory_usage,
-            restart_count=restart_count,
-            pod_count=pod_count
+            # Whole seconds, matching the epoch column it is stored in
+            timestamp=datetime.now().replace(microsecond=0),
+            request_rate=results['request_rate'],
+            error_rate=results['error_rate'],
+            latency_p50=results['latency_p50'],
+            latency_p95=results['latency_p95'],
+            latency_p99=results['latency_p99'],
+            cpu_usage=results['cpu_usage'],
+            memory_usage=results['memory_usage'],
+            restart_count=int(results['restart_count']),
+            pod_count=int(results['pod_count'])
         )
     
     def _extract_value(self, response: Dict) -> float:
@@ -198,63 +362,108 @@ class MetricsCollector:
     
     def store_metrics(self, metrics: ServiceMetrics):
         """Store metrics in database"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        self.store_metrics_batch([metrics])
+    
+    def store_metrics_batch(self, metrics_list: List[ServiceMetrics]):
+        """Store metrics for many services in a single transaction"""
+        rows = [
+            (
+                metrics.service_name,
+                int(metrics.timestamp.timestamp()),
+                metrics.request_rate,
+                metrics.error_rate,
+                metrics.latency_p50,
+                metrics.latency_p95,
+                metrics.latency_p99,
+                metrics.cpu_usage,
+                metrics.memory_usage,
+                metrics.restart_count,
+                metrics.pod_count
+            )
+            for metrics in metrics_list
+        ]
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO service_metrics 
-            (service_name, timestamp, request_rate, error_rate, latency_p50, 
-             latency_p95, latency_p99, cpu_usage, memory_usage, restart_count, pod_count)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            metrics.service_name,
-            metrics.timestamp.isoformat(),
-            metrics.request_rate,
-            metrics.error_rate,
-            metrics.latency_p50,
-            metrics.latency_p95,
-            metrics.latency_p99,
-            metrics.cpu_usage,
-            metrics.memory_usage,
-            metrics.restart_count,
-            metrics.pod_count
-        ))
+        with DB_LOCK, DB:
+            DB.execute('BEGIN')
+            DB.executemany('''
+                INSERT INTO service_metrics 
+                (service_name, timestamp, request_rate, error_rate, latency_p50, 
+                 latency_p95, latency_p99, cpu_usage, memory_usage, restart_count, pod_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(service_name, timestamp) DO NOTHING
+            ''', rows)
         
-        conn.commit()
-        conn.close()
+        # Mirror ON CONFLICT DO NOTHING: a duplicate timestamp keeps the first row
+        with LATEST_LOCK:
+            for metrics in metrics_list:
+                current = LATEST.get(metrics.service_name)
+                if current is None or metrics.timestamp > current.timestamp:
+                    LATEST[metrics.service_name] = metrics
 
 class AnomalyDetector:
     """Detects anomalies in service metrics using ML models"""
     
     def __init__(self):
-        self.models = {
-            'isolation_forest': IsolationForest(contamination=0.1, random_state=42),
-            'ecod': ECOD(contamination=0.1)
-        }
+        # A fresh model is fitted on every pass, see detect_anomalies
+        self._model_factory = lambda: ECOD(contamination=0.1)
+        # Per-service fits are independent; NumPy releases the GIL for the
+        # heavy reductions, so a thread pool overlaps them
+        self.executor = ThreadPoolExecutor()
     
     def get_metric_features(self, service_name: str, hours: int = 24) -> np.ndarray:
         """Get feature vectors for a service over time window"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = get_conn().cursor()
         
         cutoff_time = datetime.now() - timedelta(hours=hours)
+        params = (service_name, int(cutoff_time.timestamp()))
+        
+        # Size the feature matrix up front (cheap on the service/timestamp index)
+        cursor.execute('''
+            SELECT COUNT(*) FROM service_metrics
+            WHERE service_name = ? AND timestamp > ?
+        ''', params)
+        count = cursor.fetchone()[0]
         
+        if not count:
+            return np.array([])
+        
+        # Copy rows straight into a float matrix in chunks rather than
+        # materializing the whole result as a list of tuples first
+        features = np.empty((count, 6), dtype=np.float64)
+        cursor.arraysize = 1000
         cursor.execute('''
             SELECT request_rate, error_rate, latency_p95, cpu_usage, memory_usage, restart_count
             FROM service_metrics
             WHERE service_name = ? AND timestamp > ?
             ORDER BY timestamp DESC
-        ''', (service_name, cutoff_time.isoformat()))
+            LIMIT ?
+        ''', params + (count,))
         
-        rows = cursor.fetchall()
-        conn.close()
+        filled = 0
+        for chunk in iter(cursor.fetchmany, []):
+            features[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
         
-        if not rows:
-            return np.array([])
+        return features[:filled]
+    
+    def detect_all(self, service_names: List[str]) -> Dict[str, List[Dict]]:
+        """Detect anomalies for many services in parallel and store them together"""
+        def detect_one(service_name: str) -> List[Dict]:
+            try:
+                return self.detect_anomalies(service_name, store=False)
+            except Exception as e:
+                print(f"Error detecting anomalies for {service_name}: {e}")
+                return []
+        
+        results = dict(zip(service_names, self.executor.map(detect_one, service_names)))
+        
+        detected = [anomaly for anomalies in results.values() for anomaly in anomalies]
+        if detected:
+            self._store_anomalies(detected)
         
-        return np.array(rows)
+        return results
     
-    def detect_anomalies(self, service_name: str) -> List[Dict]:
+    def detect_anomalies(self, service_name: str, store: bool = True) -> List[Dict]:
         """Detect anomalies and assign severity levels"""
         features = self.get_metric_features(service_name)
         
@@ -263,21 +472,26 @@ class AnomalyDetector:
         
         anomalies = []
         
-        # Use ECOD for anomaly detection
-        model = ECOD(contamination=0.1)
-        model.fit(features)
-        
-        # Get anomaly scores and predictions
-        scores = model.decision_scores_
-        predictions = model.labels_
-        
         # Analyze recent metrics (last 5 data points)
         recent_features = features[:5]
-        recent_scores = scores[:5]
-        recent_predictions = predictions[:5]
+        
+        # Use ECOD for anomaly detection. Refit on the current window every
+        # pass: ECOD's decision_function rebuilds the ECDFs over X_train plus
+        # the new rows anyway, and labelling those scores against an old
+        # fit's threshold_ misses anomalies a fresh fit would flag
+        model = self._model_factory()
+        model.fit(features)
+        recent_scores = model.decision_scores_[:5]
+        recent_predictions = model.labels_[:5]
         
         metric_names = ['request_rate', 'error_rate', 'latency_p95', 'cpu_usage', 'memory_usage', 'restart_count']
         
+        # Flag metrics more than 2 std devs from the window mean, for all
+        # recent points at once (shape: recent points x metrics)
+        means = features.mean(axis=0)
+        stds = features.std(axis=0)
+        deviation_mask = np.abs(recent_features - means) > 2 * stds
+        
         for idx, (score, is_anomaly) in enumerate(zip(recent_scores, recent_predictions)):
             if is_anomaly == 1:
                 # Determine severity
@@ -291,15 +505,7 @@ class AnomalyDetector:
                     severity = 'low'
                 
                 # Find which metrics are anomalous
-                feature_vector = recent_features[idx]
-                affected_metrics = []
-                
-                for i, (metric_name, value) in enumerate(zip(metric_names, feature_vector)):
-                    metric_mean = np.mean(features[:, i])
-                    metric_std = np.std(features[:, i])
-                    
-                    if abs(value - metric_mean) > 2 * metric_std:
-                        affected_metrics.append(metric_name)
+                affected_metrics = [metric_names[i] for i in np.flatnonzero(deviation_mask[idx])]
                 
                 anomaly = {
                     'service_name': service_name,
@@ -307,12 +513,14 @@ class AnomalyDetector:
                     'anomaly_type': 'metric_deviation',
                     'severity': severity,
                     'anomaly_score': float(score),
-                    'affected_metrics': ', '.join(affected_metrics),
+                    'affected_metrics': affected_metrics,
                     'description': self._generate_description(severity, affected_metrics)
                 }
                 
                 anomalies.append(anomaly)
-                self._store_anomaly(anomaly)
+        
+        if anomalies and store:
+            self._store_anomalies(anomalies)
         
         return anomalies
     
@@ -324,27 +532,28 @@ class AnomalyDetector:
         metrics_str = ', '.join(affected_metrics)
         return f"{severity.capitalize()} anomaly: unusual patterns in {metrics_str}"
     
-    def _store_anomaly(self, anomaly: Dict):
-        """Store anomaly in database"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO metrics_anomalies 
-            (service_name, timestamp, anomaly_type, severity, anomaly_score, affected_metrics, description)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            anomaly['service_name'],
-            anomaly['timestamp'],
-            anomaly['anomaly_type'],
-            anomaly['severity'],
-            anomaly['anomaly_score'],
-            anomaly['affected_metrics'],
-            anomaly['description']
-        ))
+    def _store_anomalies(self, anomalies: List[Dict]):
+        """Store anomalies in database in a single transaction"""
+        rows = [
+            (
+                anomaly['service_name'],
+                anomaly['timestamp'],
+                anomaly['anomaly_type'],
+                anomaly['severity'],
+                anomaly['anomaly_score'],
+                json.dumps(anomaly['affected_metrics']),
+                anomaly['description']
+            )
+            for anomaly in anomalies
+        ]
         
-        conn.commit()
-        conn.close()
+        with DB_LOCK, DB:
+            DB.execute('BEGIN')
+            DB.executemany('''
+                INSERT INTO metrics_anomalies 
+                (service_name, timestamp, anomaly_type, severity, anomaly_score, affected_metrics, description)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
 
 # Initialize components
 prom_client = PrometheusClient(PROMETHEUS_URL)
@@ -356,19 +565,18 @@ anomaly_detector = AnomalyDetector()
 @app.route('/api/services', methods=['GET'])
 def get_services():
     """Get list of all registered services"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
     
     cursor.execute('SELECT service_name, service_type, status, last_seen FROM services')
     rows = cursor.fetchall()
-    conn.close()
     
     services = [
         {
-            'name': row[0],
-            'type': row[1],
-            'status': row[2],
-            'last_seen': row[3]
+            'name': row['service_name'],
+            'type': row['service_type'],
+            'status': row['status'],
+            'last_seen': row['last_seen']
         }
         for row in rows
     ]
@@ -382,114 +590,104 @@ def register_service():
     service_name = data.get('service_name')
     service_type = data.get('service_type', 'unknown')
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO services (service_name, service_type, last_seen)
-            VALUES (?, ?, ?)
-        ''', (service_name, service_type, datetime.now().isoformat()))
-        conn.commit()
+        with DB_LOCK:
+            DB.execute('''
+                INSERT INTO services (service_name, service_type, last_seen)
+                VALUES (?, ?, ?)
+            ''', (service_name, service_type, datetime.now().isoformat()))
         return jsonify({'success': True, 'message': 'Service registered'})
     except sqlite3.IntegrityError:
         return jsonify({'success': False, 'message': 'Service already exists'}), 400
-    finally:
-        conn.close()
 
 @app.route('/api/health/summary', methods=['GET'])
 def get_health_summary():
     """Get health summary for all services"""
     service_name = request.args.get('service')
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    refresh_latest_metrics()
+    with LATEST_LOCK:
+        if service_name:
+            latest = [LATEST[service_name]] if service_name in LATEST else []
+        else:
+            latest = list(LATEST.values())
     
-    if service_name:
-        # Get specific service health
-        cursor.execute('''
-            SELECT * FROM service_metrics 
-            WHERE service_name = ?
-            ORDER BY timestamp DESC 
-            LIMIT 1
-        ''', (service_name,))
-    else:
-        # Get all services latest metrics
-        cursor.execute('''
-            SELECT sm.* FROM service_metrics sm
-            INNER JOIN (
-                SELECT service_name, MAX(timestamp) as max_ts
-                FROM service_metrics
-                GROUP BY service_name
-            ) latest ON sm.service_name = latest.service_name 
-            AND sm.timestamp = latest.max_ts
-        ''')
-    
-    rows = cursor.fetchall()
-    conn.close()
+    health_scores = calculate_health_scores_batch(
+        [m.error_rate for m in latest],
+        [m.latency_p95 for m in latest],
+        [m.cpu_usage for m in latest]
+    ).tolist()
     
     summary = []
-    for row in rows:
-        health_score = calculate_health_score(row)
+    for metrics, health_score in zip(latest, health_scores):
         summary.append({
-            'service_name': row[1],
-            'timestamp': row[2],
-            'request_rate': row[3],
-            'error_rate': row[4],
+            'service_name': metrics.service_name,
+            'timestamp': metrics.timestamp.isoformat(timespec='seconds'),
+            'request_rate': metrics.request_rate,
+            'error_rate': metrics.error_rate,
             'latency': {
-                'p50': row[5],
-                'p95': row[6],
-                'p99': row[7]
+                'p50': metrics.latency_p50,
+                'p95': metrics.latency_p95,
+                'p99': metrics.latency_p99
             },
             'resources': {
-                'cpu': row[8],
-                'memory': row[9]
+                'cpu': metrics.cpu_usage,
+                'memory': metrics.memory_usage
             },
-            'restart_count': row[10],
-            'pod_count': row[11],
+            'restart_count': metrics.restart_count,
+            'pod_count': metrics.pod_count,
             'health_score': health_score,
             'status': get_status_from_health(health_score)
         })
     
     return jsonify(summary)
 
+def _affected_metrics_json(value):
+    """Embed a stored affected_metrics JSON array in a response without re-parsing it"""
+    if not value:
+        return []
+    if value.startswith('['):
+        return orjson.Fragment(value)
+    # Rows written before the JSON format stored a comma-separated list
+    return value.split(', ')
+
 @app.route('/api/health/anomalies', methods=['GET'])
 def get_anomalies():
     """Get recent anomalies"""
     service_name = request.args.get('service')
     hours = int(request.args.get('hours', 24))
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
     
     cutoff_time = datetime.now() - timedelta(hours=hours)
+    columns = 'id, service_name, timestamp, anomaly_type, severity, anomaly_score, affected_metrics, description'
     
     if service_name:
-        cursor.execute('''
-            SELECT * FROM metrics_anomalies
+        cursor.execute(f'''
+            SELECT {columns} FROM metrics_anomalies
             WHERE service_name = ? AND timestamp > ?
             ORDER BY timestamp DESC
         ''', (service_name, cutoff_time.isoformat()))
     else:
-        cursor.execute('''
-            SELECT * FROM metrics_anomalies
+        cursor.execute(f'''
+            SELECT {columns} FROM metrics_anomalies
             WHERE timestamp > ?
             ORDER BY timestamp DESC
         ''', (cutoff_time.isoformat(),))
     
     rows = cursor.fetchall()
-    conn.close()
     
     anomalies = [
         {
-            'id': row[0],
-            'service_name': row[1],
-            'timestamp': row[2],
-            'anomaly_type': row[3],
-            'severity': row[4],
-            'anomaly_score': row[5],
-            'affected_metrics': row[6].split(', ') if row[6] else [],
-            'description': row[7]
+            'id': row['id'],
+            'service_name': row['service_name'],
+            'timestamp': row['timestamp'],
+            'anomaly_type': row['anomaly_type'],
+            'severity': row['severity'],
+            'anomaly_score': row['anomaly_score'],
+            'affected_metrics': _affected_metrics_json(row['affected_metrics']),
+            'description': row['description']
         }
         for row in rows
     ]
@@ -505,35 +703,24 @@ def get_metrics_history():
     if not service_name:
         return jsonify({'error': 'service parameter required'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = get_conn().cursor()
     
     cutoff_time = datetime.now() - timedelta(hours=hours)
+    history_fields = METRIC_FIELDS[1:]  # everything but service_name
     
-    cursor.execute('''
-        SELECT * FROM service_metrics
+    cursor.execute(f'''
+        SELECT {', '.join(history_fields)} FROM service_metrics
         WHERE service_name = ? AND timestamp > ?
         ORDER BY timestamp ASC
-    ''', (service_name, cutoff_time.isoformat()))
+    ''', (service_name, int(cutoff_time.timestamp())))
     
     rows = cursor.fetchall()
-    conn.close()
     
-    history = [
-        {
-            'timestamp': row[2],
-            'request_rate': row[3],
-            'error_rate': row[4],
-            'latency_p50': row[5],
-            'latency_p95': row[6],
-            'latency_p99': row[7],
-            'cpu_usage': row[8],
-            'memory_usage': row[9],
-            'restart_count': row[10],
-            'pod_count': row[11]
-        }
-        for row in rows
-    ]
+    # Column-oriented payload: one array per field instead of one dict per row.
+    # Plain tuples here, since the columns are transposed rather than looked up.
+    columns = list(zip(*rows)) if rows else [()] * len(history_fields)
+    history = {field: list(column) for field, column in zip(history_fields, columns)}
+    history['timestamp'] = [datetime.fromtimestamp(ts).isoformat() for ts in history['timestamp']]
     
     return jsonify(history)
 
@@ -555,38 +742,31 @@ def trigger_collection(service_name):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def calculate_health_score(metric_row) -> float:
-    """Calculate 0-100 health score based on metrics"""
-    error_rate = metric_row[4] or 0
-    latency_p95 = metric_row[6] or 0
-    cpu_usage = metric_row[8] or 0
+def calculate_health_scores_batch(error_rate, latency_p95, cpu_usage) -> np.ndarray:
+    """Calculate 0-100 health scores for arrays of metrics in one pass"""
+    # Missing values become NaN, which never exceeds a threshold (scored as 0)
+    err = np.asarray(error_rate, dtype=np.float64)
+    lat = np.asarray(latency_p95, dtype=np.float64)
+    cpu = np.asarray(cpu_usage, dtype=np.float64)
     
     # Simple scoring algorithm
     score = 100
     
     # Penalize high error rates
-    if error_rate > 0.1:
-        score -= 30
-    elif error_rate > 0.05:
-        score -= 15
-    elif error_rate > 0.01:
-        score -= 5
+    score = score - np.select([err > 0.1, err > 0.05, err > 0.01], [30, 15, 5], 0)
     
     # Penalize high latency (assuming ms)
-    if latency_p95 > 1000:
-        score -= 25
-    elif latency_p95 > 500:
-        score -= 15
-    elif latency_p95 > 200:
-        score -= 5
+    score = score - np.select([lat > 1000, lat > 500, lat > 200], [25, 15, 5], 0)
     
     # Penalize high CPU
-    if cpu_usage > 0.9:
-        score -= 20
-    elif cpu_usage > 0.7:
-        score -= 10
+    score = score - np.select([cpu > 0.9, cpu > 0.7], [20, 10], 0)
     
-    return max(0, score)
+    return np.maximum(0, score)
+
+def calculate_health_score(metrics: ServiceMetrics) -> float:
+    """Calculate 0-100 health score based on metrics"""
+    scores = calculate_health_scores_batch([metrics.error_rate], [metrics.latency_p95], [metrics.cpu_usage])
+    return scores.item()
 
 def get_status_from_health(health_score: float) -> str:
     """Convert health score to status"""
@@ -601,44 +781,26 @@ def get_status_from_health(health_score: float) -> str:
 
 # Background collection worker
 def background_collector():
-    """Background thread to collect metrics periodically"""
+    """Collect metrics periodically; run by collector.py or the dev server thread"""
     while True:
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
+            cursor = get_conn().cursor()
             cursor.execute('SELECT service_name FROM services WHERE status = "active"')
             services = [row[0] for row in cursor.fetchall()]
-            conn.close()
             
-            for service_name in services:
-                try:
-                    metrics = metrics_collector.collect_service_metrics(service_name)
-                    metrics_collector.store_metrics(metrics)
-                    anomaly_detector.detect_anomalies(service_name)
-                except Exception as e:
-                    print(f"Error collecting metrics for {service_name}: {e}")
+            # Query every service concurrently, then write the cycle in one batch
+            metrics_collector.store_metrics_batch(metrics_collector.collect_all(services))
+            anomaly_detector.detect_all(services)
             
             time.sleep(60)  # Collect every minute
         except Exception as e:
             print(f"Background collector error: {e}")
             time.sleep(60)
 
-# Start background collector
-collector_thread = threading.Thread(target=background_collector, daemon=True)
-collector_thread.start()
-
 if __name__ == '__main__':
-    # Create some demo data for testing
-    demo_services = ['api-gateway', 'user-service', 'payment-service', 'notification-service']
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    for svc in demo_services:
-        try:
-            cursor.execute('INSERT INTO services (service_name, service_type, last_seen) VALUES (?, ?, ?)',
-                         (svc, 'microservice', datetime.now().isoformat()))
-        except sqlite3.IntegrityError:
-            pass
-    conn.commit()
-    conn.close()
+    # Development server only: under gunicorn the collector runs as its own
+    # process (collector.py) so it doesn't contend with request handlers
+    collector_thread = threading.Thread(target=background_collector, daemon=True)
+    collector_thread.start()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
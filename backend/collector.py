@@ -0,0 +1,11 @@
+"""
+Cloud Monitoring Platform - Metrics Collector
+Runs metric collection and anomaly detection as a standalone process alongside
+the gunicorn web workers; the two share state only through SQLite (WAL mode)
+"""
+
+from app import background_collector
+
+if __name__ == '__main__':
+    print("Starting metrics collector...")
+    background_collector()
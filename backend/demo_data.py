@@ -3,22 +3,39 @@ Demo Data Generator for CloudWatch Observatory
 Generates realistic mock metrics for testing without a live Prometheus instance
 """
 
+import os
 import random
 import sqlite3
+import numpy as np
 from datetime import datetime, timedelta
 import time
 
-DB_PATH = 'monitoring.db'
+DB_PATH = os.environ.get('DB_PATH', 'monitoring.db')
+
+# Single connection in autocommit mode; bulk writes open an explicit BEGIN
+DB = sqlite3.connect(DB_PATH, isolation_level=None)
+DB.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+''')
+
+INSERT_SQL = '''
+    INSERT INTO service_metrics 
+    (service_name, timestamp, request_rate, error_rate, latency_p50, 
+     latency_p95, latency_p99, cpu_usage, memory_usage, restart_count, pod_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(service_name, timestamp) DO NOTHING
+'''
 
 def init_db():
     """Create the service_metrics table if it doesn't exist"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
+    DB.execute('''
         CREATE TABLE IF NOT EXISTS service_metrics (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             service_name TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
             request_rate REAL,
             error_rate REAL,
             latency_p50 REAL,
@@ -31,110 +48,108 @@ def init_db():
             UNIQUE(service_name, timestamp)
         )
     ''')
-    conn.commit()
-    conn.close()
 
 
-def generate_realistic_metrics(service_name, base_time, variation='normal'):
-    """Generate realistic metrics with different patterns"""
-    
-    # Base patterns for different service types
-    patterns = {
-        'api-gateway': {
-            'request_rate': (80, 150),
-            'error_rate': (0.001, 0.02),
-            'latency_p50': (30, 60),
-            'latency_p95': (90, 180),
-            'latency_p99': (200, 400),
-            'cpu_usage': (0.3, 0.6),
-            'memory_usage': (400_000_000, 800_000_000),
-            'pod_count': 3
-        },
-        'user-service': {
-            'request_rate': (50, 100),
-            'error_rate': (0.005, 0.03),
-            'latency_p50': (40, 80),
-            'latency_p95': (100, 200),
-            'latency_p99': (250, 500),
-            'cpu_usage': (0.2, 0.5),
-            'memory_usage': (300_000_000, 600_000_000),
-            'pod_count': 2
-        },
-        'payment-service': {
-            'request_rate': (20, 50),
-            'error_rate': (0.002, 0.015),
-            'latency_p50': (100, 200),
-            'latency_p95': (300, 500),
-            'latency_p99': (600, 1000),
-            'cpu_usage': (0.4, 0.7),
-            'memory_usage': (500_000_000, 1_000_000_000),
-            'pod_count': 4
-        },
-        'notification-service': {
-            'request_rate': (10, 30),
-            'error_rate': (0.01, 0.05),
-            'latency_p50': (50, 100),
-            'latency_p95': (150, 300),
-            'latency_p99': (400, 700),
-            'cpu_usage': (0.15, 0.4),
-            'memory_usage': (200_000_000, 500_000_000),
-            'pod_count': 2
-        }
+# Base patterns for different service types
+PATTERNS = {
+    'api-gateway': {
+        'request_rate': (80, 150),
+        'error_rate': (0.001, 0.02),
+        'latency_p50': (30, 60),
+        'latency_p95': (90, 180),
+        'latency_p99': (200, 400),
+        'cpu_usage': (0.3, 0.6),
+        'memory_usage': (400_000_000, 800_000_000),
+        'pod_count': 3
+    },
+    'user-service': {
+        'request_rate': (50, 100),
+        'error_rate': (0.005, 0.03),
+        'latency_p50': (40, 80),
+        'latency_p95': (100, 200),
+        'latency_p99': (250, 500),
+        'cpu_usage': (0.2, 0.5),
+        'memory_usage': (300_000_000, 600_000_000),
+        'pod_count': 2
+    },
+    'payment-service': {
+        'request_rate': (20, 50),
+        'error_rate': (0.002, 0.015),
+        'latency_p50': (100, 200),
+        'latency_p95': (300, 500),
+        'latency_p99': (600, 1000),
+        'cpu_usage': (0.4, 0.7),
+        'memory_usage': (500_000_000, 1_000_000_000),
+        'pod_count': 4
+    },
+    'notification-service': {
+        'request_rate': (10, 30),
+        'error_rate': (0.01, 0.05),
+        'latency_p50': (50, 100),
+        'latency_p95': (150, 300),
+        'latency_p99': (400, 700),
+        'cpu_usage': (0.15, 0.4),
+        'memory_usage': (200_000_000, 500_000_000),
+        'pod_count': 2
     }
-    
-    # Get pattern for this service or use default
-    pattern = patterns.get(service_name, patterns['user-service'])
+}
+
+SERVICES = list(PATTERNS)
+
+# Fields drawn uniformly from (low, high) bounds, in INSERT_SQL column order
+SAMPLED_FIELDS = ('request_rate', 'error_rate', 'latency_p50', 'latency_p95',
+                  'latency_p99', 'cpu_usage', 'memory_usage')
+VARIATIONS = ('normal', 'spike', 'degraded')
+CPU_INDEX = SAMPLED_FIELDS.index('cpu_usage')
+SPIKE_CPU_CAP = 0.95
+
+def _variation_bounds(pattern, variation):
+    """Return the (low, high) sampling bounds for each of SAMPLED_FIELDS"""
+    bounds = {field: pattern[field] for field in SAMPLED_FIELDS}
+    request_low, request_high = pattern['request_rate']
+    error_high = pattern['error_rate'][1]
+    cpu_high = pattern['cpu_usage'][1]
     
     # Apply variation patterns
     if variation == 'spike':
-        # Simulate traffic spike
-        request_rate = random.uniform(pattern['request_rate'][1] * 2, pattern['request_rate'][1] * 3)
-        error_rate = random.uniform(pattern['error_rate'][1], pattern['error_rate'][1] * 2)
-        cpu_usage = min(0.95, random.uniform(pattern['cpu_usage'][1], pattern['cpu_usage'][1] * 1.5))
+        # Simulate traffic spike (CPU is capped at SPIKE_CPU_CAP after sampling)
+        bounds['request_rate'] = (request_high * 2, request_high * 3)
+        bounds['error_rate'] = (error_high, error_high * 2)
+        bounds['cpu_usage'] = (cpu_high, cpu_high * 1.5)
     elif variation == 'degraded':
         # Simulate degraded performance
-        request_rate = random.uniform(pattern['request_rate'][0] * 0.5, pattern['request_rate'][0])
-        error_rate = random.uniform(pattern['error_rate'][1] * 2, pattern['error_rate'][1] * 5)
-        cpu_usage = random.uniform(pattern['cpu_usage'][0], pattern['cpu_usage'][1])
-    else:
-        # Normal operation
-        request_rate = random.uniform(*pattern['request_rate'])
-        error_rate = random.uniform(*pattern['error_rate'])
-        cpu_usage = random.uniform(*pattern['cpu_usage'])
+        bounds['request_rate'] = (request_low * 0.5, request_low)
+        bounds['error_rate'] = (error_high * 2, error_high * 5)
+    
+    return [bounds[field] for field in SAMPLED_FIELDS]
+
+def generate_realistic_metrics(service_name, base_time, variation='normal'):
+    """Generate realistic metrics with different patterns"""
     
-    latency_p50 = random.uniform(*pattern['latency_p50'])
-    latency_p95 = random.uniform(*pattern['latency_p95'])
-    latency_p99 = random.uniform(*pattern['latency_p99'])
-    memory_usage = random.uniform(*pattern['memory_usage'])
+    # Get pattern for this service or use default
+    pattern = PATTERNS.get(service_name, PATTERNS['user-service'])
+    
+    metrics = {
+        field: random.uniform(low, high)
+        for field, (low, high) in zip(SAMPLED_FIELDS, _variation_bounds(pattern, variation))
+    }
+    if variation == 'spike':
+        metrics['cpu_usage'] = min(SPIKE_CPU_CAP, metrics['cpu_usage'])
     
     # Occasionally increment restart count
     restart_count = random.randint(0, 1) if random.random() < 0.05 else 0
     
     return {
         'service_name': service_name,
-        'timestamp': base_time.isoformat(),
-        'request_rate': request_rate,
-        'error_rate': error_rate,
-        'latency_p50': latency_p50,
-        'latency_p95': latency_p95,
-        'latency_p99': latency_p99,
-        'cpu_usage': cpu_usage,
-        'memory_usage': memory_usage,
+        'timestamp': int(base_time.timestamp()),
+        **metrics,
         'restart_count': restart_count,
         'pod_count': pattern['pod_count']
     }
 
-def insert_metrics(metrics):
-    """Insert metrics into database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT OR REPLACE INTO service_metrics 
-        (service_name, timestamp, request_rate, error_rate, latency_p50, 
-         latency_p95, latency_p99, cpu_usage, memory_usage, restart_count, pod_count)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+def _metrics_row(metrics):
+    """Flatten a metrics dict into an INSERT_SQL parameter tuple"""
+    return (
         metrics['service_name'],
         metrics['timestamp'],
         metrics['request_rate'],
@@ -146,41 +161,70 @@ def insert_metrics(metrics):
         metrics['memory_usage'],
         metrics['restart_count'],
         metrics['pod_count']
-    ))
-    
-    conn.commit()
-    conn.close()
+    )
+
+def insert_metrics(metrics):
+    """Insert metrics into database"""
+    DB.execute(INSERT_SQL, _metrics_row(metrics))
 
-def generate_historical_data(hours=24):
+def insert_metrics_batch(rows):
+    """Insert many metric rows in a single transaction"""
+    with DB:
+        DB.execute('BEGIN')
+        DB.executemany(INSERT_SQL, rows)
+
+def generate_historical_data(hours=24, seed=None):
     """Generate historical metrics data for the past N hours"""
-    services = ['api-gateway', 'user-service', 'payment-service', 'notification-service']
+    services = SERVICES
+    rng = np.random.default_rng(seed)
     
     print(f"Generating {hours} hours of historical data...")
     
     # Generate data points every 5 minutes
     num_points = hours * 12  # 12 points per hour (every 5 min)
+    base_time = datetime.now()
+    
+    # Sampling bounds indexed as [variation, service, field, low/high]
+    bounds = np.array([
+        [_variation_bounds(PATTERNS[service], variation) for service in services]
+        for variation in VARIATIONS
+    ])
+    
+    # Randomly introduce anomalies: 5% chance, split evenly between spike and degraded
+    shape = (num_points, len(services))
+    anomalous = rng.random(shape) < 0.05
+    variation_idx = np.where(anomalous, rng.integers(1, len(VARIATIONS), size=shape), 0)
+    
+    # Draw every sampled field for every point and service in one call
+    point_bounds = bounds[variation_idx, np.arange(len(services))]
+    values = rng.uniform(point_bounds[..., 0], point_bounds[..., 1])
+    spiking = variation_idx == VARIATIONS.index('spike')
+    values[..., CPU_INDEX] = np.where(spiking, np.minimum(values[..., CPU_INDEX], SPIKE_CPU_CAP),
+                                      values[..., CPU_INDEX])
+    
+    # Occasionally increment restart count
+    restarts = np.where(rng.random(shape) < 0.05, rng.integers(0, 2, size=shape), 0)
+    
+    pod_counts = [PATTERNS[service]['pod_count'] for service in services]
+    values = values.tolist()
+    restarts = restarts.tolist()
+    rows = []
     
     for i in range(num_points):
-        timestamp = datetime.now() - timedelta(minutes=5 * (num_points - i))
+        timestamp = int((base_time - timedelta(minutes=5 * (num_points - i))).timestamp())
         
-        for service in services:
-            # Randomly introduce anomalies
-            if random.random() < 0.05:  # 5% chance of anomaly
-                variation = random.choice(['spike', 'degraded'])
-            else:
-                variation = 'normal'
-            
-            metrics = generate_realistic_metrics(service, timestamp, variation)
-            insert_metrics(metrics)
+        for j, service in enumerate(services):
+            rows.append((service, timestamp, *values[i][j], restarts[i][j], pod_counts[j]))
         
         if (i + 1) % 12 == 0:  # Progress update every hour
             print(f"  Generated {i + 1}/{num_points} data points...")
     
+    insert_metrics_batch(rows)
     print(f"✓ Historical data generation complete!")
 
 def generate_live_stream(duration_minutes=60):
     """Generate live streaming data for testing real-time updates"""
-    services = ['api-gateway', 'user-service', 'payment-service', 'notification-service']
+    services = SERVICES
     
     print(f"Streaming live data for {duration_minutes} minutes...")
     print("Press Ctrl+C to stop")
@@ -4,17 +4,123 @@ Monitors Docker containers, images, networks, and volumes
 """
 
 import docker
-from docker.errors import DockerException
-from datetime import datetime
-from typing import List, Dict, Any
+from docker.errors import DockerException, InvalidVersion
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterator, Iterable
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-DB_PATH = 'monitoring.db'
+DB_PATH = os.environ.get('DB_PATH', 'monitoring.db')
+
+logger = logging.getLogger(__name__)
+
+# One long-lived connection for every Docker write, owned by the writer thread
+# below (_LOCK also covers startup DDL). Autocommit mode, so batches open an
+# explicit BEGIN inside "with _CONN:".
+# journal_mode=WAL persists in the database file; the rest apply to this
+# connection. busy_timeout waits out other writers instead of SQLITE_BUSY.
+_CONN = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+_CONN.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-65536;
+    PRAGMA temp_store=MEMORY;
+''')
+_LOCK = threading.Lock()
+
+# Producers hand (sql, rows) batches to a single writer thread, which groups
+# whatever arrives within WRITE_FLUSH_SECONDS (or WRITE_FLUSH_ROWS rows) into
+# one transaction, so concurrent collectors never contend for the write lock.
+# Each batch runs under its own SAVEPOINT, so a bad batch is dropped alone
+# rather than rolling back everything else in its window.
+WRITE_FLUSH_SECONDS = 0.1
+WRITE_FLUSH_ROWS = 1000
+_write_queue: queue.Queue = queue.Queue()
+
+def enqueue_write(sql: str, rows: Iterable[tuple]):
+    """Queue an executemany batch for the writer thread"""
+    _write_queue.put((sql, list(rows)))
+
+def _write_batches(batches: List[tuple], conn: sqlite3.Connection = _CONN) -> int:
+    """Commit (sql, rows) batches in one transaction, returning how many rows were dropped"""
+    dropped = 0
+    with conn:
+        conn.execute('BEGIN')
+        for sql, rows in batches:
+            conn.execute('SAVEPOINT batch')
+            try:
+                conn.executemany(sql, rows)
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK TO batch')
+                dropped += len(rows)
+                logger.error("Dropped a batch of %d rows: %s", len(rows), e)
+            conn.execute('RELEASE batch')
+    return dropped
+
+def _writer_loop():
+    """Drain the write queue, committing one transaction per flush window"""
+    while True:
+        batches = [_write_queue.get()]
+        pending = len(batches[0][1])
+        deadline = time.monotonic() + WRITE_FLUSH_SECONDS
+        while pending < WRITE_FLUSH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch = _write_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batches.append(batch)
+            pending += len(batch[1])
+        
+        try:
+            with _LOCK:
+                _write_batches(batches)
+        except sqlite3.Error as e:
+            logger.error("Error writing %d rows: %s", pending, e)
+        finally:
+            for _ in batches:
+                _write_queue.task_done()
+
+_writer_thread = threading.Thread(target=_writer_loop, daemon=True)
+_writer_thread.start()
+
+# Registration: a started (or, on a discovery pass, running) container
+# (re)activates its service, a dead one marks it inactive so the collector
+# stops querying it
+SERVICE_STARTED_SQL = '''
+    INSERT INTO services (service_name, service_type, status, last_seen)
+    VALUES (?, 'docker_container', 'active', ?)
+    ON CONFLICT(service_name) DO UPDATE SET status = 'active', last_seen = excluded.last_seen
+'''
+
+SERVICE_DIED_SQL = '''
+    UPDATE services SET status = 'inactive', last_seen = ? WHERE service_name = ?
+'''
+
+# Discovery results are served from memory for this long between Docker API calls
+CACHE_TTL_SECONDS = 5
+
+@lru_cache(maxsize=1024)
+def _created_from_epoch(epoch: int) -> str:
+    """
+    Format the list endpoint's Created epoch like inspect's RFC 3339 UTC Created
+    string (to the second), memoized since creation times repeat every discovery
+    """
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
 
 class DockerMonitor:
     """Monitor Docker containers and collect metrics"""
     
-    def __init__(self, docker_host='unix://var/run/docker.sock'):
+    def __init__(self, docker_host='unix://var/run/docker.sock', stream_stats=True, auto_register=False):
         """
         Initialize Docker client
         
@@ -22,114 +128,328 @@ class DockerMonitor:
             docker_host: Docker daemon socket or TCP endpoint
                         - unix://var/run/docker.sock (local)
                         - tcp://remote-host:2375 (remote)
+            stream_stats: Keep a stats stream per container; when False every
+                        get_container_stats call takes a one-shot sample
+            auto_register: Register/deactivate services from container start
+                        and die events instead of polling register_containers_as_services
         """
+        self.stream_stats = stream_stats
+        self.auto_register = auto_register
+        # One long-lived stats stream per running container. Each reader thread
+        # keeps the newest decoded sample (and the one before it, for CPU deltas)
+        # so get_container_stats never waits on the engine's ~1s sampling.
+        self._stream_threads: Dict[str, threading.Thread] = {}
+        self._stream_stops: Dict[str, threading.Event] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._previous: Dict[str, Dict[str, Any]] = {}
+        self._stream_lock = threading.Lock()
+        # Last one-shot sample per container, for CPU deltas without streaming;
+        # dropped when the container dies or leaves the running set
+        self._prev_oneshot: Dict[str, Dict[str, Any]] = {}
+        # Shared pool so one-shot stats calls overlap on the dockerd socket
+        self._pool = ThreadPoolExecutor(max_workers=16)
+        # key -> {'value': ..., 'expires': monotonic time}
+        self._cache: Dict[Any, Dict[str, Any]] = {}
+        # Set once the events request is open, so dockerd is buffering for us
+        self._events_subscribed = threading.Event()
+        
         try:
             self.client = docker.DockerClient(base_url=docker_host)
-            self.api_client = docker.APIClient(base_url=docker_host)
+            # Room for the stats pool and per-container streams without queueing
+            # on urllib3; stats streams emit every ~1s, well inside the timeout
+            self.api_client = docker.APIClient(base_url=docker_host, num_pools=32,
+                                               max_pool_size=32, timeout=5)
             # Test connection
             self.client.ping()
             print(f"✓ Connected to Docker daemon: {docker_host}")
         except DockerException as e:
             print(f"✗ Failed to connect to Docker: {e}")
             self.client = None
+        
+        if self.client and (self.stream_stats or self.auto_register):
+            # Container start/die events keep the stream set (and, with
+            # auto_register, the services table) current without re-listing.
+            # Wait for the subscription before the initial pass so no start
+            # slips in between (bounded, in case dockerd is slow to answer)
+            self._events_thread = threading.Thread(target=self._watch_container_events, daemon=True)
+            self._events_thread.start()
+            self._events_subscribed.wait(timeout=5)
+            if self.auto_register:
+                self.register_containers_as_services()
+            else:
+                self.discover_containers(include_stopped=False)
     
-    def discover_containers(self, include_stopped=False) -> List[Dict[str, Any]]:
+    def _cached(self, key, loader):
+        """Return loader() from the TTL cache, calling it at most every CACHE_TTL_SECONDS"""
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry and entry['expires'] > now:
+            return entry['value']
+        
+        value = loader()
+        self._cache[key] = {'value': value, 'expires': now + CACHE_TTL_SECONDS}
+        return value
+    
+    def discover_containers(self, include_stopped=False, filters=None) -> List[Dict[str, Any]]:
         """
         Discover all Docker containers
         
         Args:
             include_stopped: Include stopped containers
+            filters: Docker-side list filters (e.g. {'label': 'app=web'})
             
         Returns:
             List of container info dictionaries
         """
+        key = ('containers', include_stopped, repr(sorted((filters or {}).items())))
+        return self._cached(key, lambda: self._discover_containers(include_stopped, filters))
+    
+    def _discover_containers(self, include_stopped: bool, filters=None) -> List[Dict[str, Any]]:
+        """List containers from the Docker API (uncached)"""
         if not self.client:
             return []
         
         try:
-            containers = self.client.containers.list(all=include_stopped)
+            # One /containers/json call carries everything we report; the SDK's
+            # containers.list() would inspect each container on top of it
+            containers = self.api_client.containers(all=include_stopped, size=False, filters=filters)
             
             discovered = []
             for container in containers:
                 info = {
-                    'id': container.id[:12],
-                    'name': container.name,
-                    'image': container.image.tags[0] if container.image.tags else container.image.id[:12],
-                    'status': container.status,
-                    'state': container.attrs['State'],
-                    'created': container.attrs['Created'],
-                    'labels': container.labels,
-                    'ports': container.ports,
-                    'networks': list(container.attrs['NetworkSettings']['Networks'].keys())
+                    'id': container['Id'][:12],
+                    'name': container['Names'][0].lstrip('/') if container['Names'] else container['Id'][:12],
+                    'image': self._image_name(container['Image']),
+                    'status': container['State'],
+                    'state': self._state_from_list(container['State']),
+                    'created': _created_from_epoch(container['Created']),
+                    'labels': container['Labels'] or {},
+                    'ports': self._ports_from_list(container['Ports']),
+                    'networks': list(((container.get('NetworkSettings') or {}).get('Networks') or {}).keys())
                 }
                 discovered.append(info)
             
+            # A filtered listing isn't the full running set, so leave streams alone
+            if self.stream_stats and not filters:
+                self._sync_stat_streams([c['id'] for c in discovered if c['status'] == 'running'])
             return discovered
             
         except DockerException as e:
             print(f"Error discovering containers: {e}")
             return []
     
+    def _state_from_list(self, state: str) -> Dict[str, Any]:
+        """Rebuild the inspect-style State dict from the list endpoint's State string"""
+        return {
+            'Status': state,
+            'Running': state == 'running',
+            'Paused': state == 'paused',
+            'Restarting': state == 'restarting',
+            'Dead': state == 'dead'
+        }
+    
+    def _image_name(self, image: str) -> str:
+        """Tag from the list endpoint's Image field, or the short ID for untagged images"""
+        if image.startswith('sha256:'):
+            return image[len('sha256:'):][:12]
+        return image
+    
+    def _ports_from_list(self, ports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert /containers/json Ports into the inspect-style {"80/tcp": [...]} map"""
+        mapped: Dict[str, Any] = {}
+        for port in ports or []:
+            key = f"{port['PrivatePort']}/{port['Type']}"
+            if 'PublicPort' in port:
+                bindings = mapped.get(key) or []
+                bindings.append({'HostIp': port.get('IP', ''), 'HostPort': str(port['PublicPort'])})
+                mapped[key] = bindings
+            else:
+                mapped.setdefault(key, None)
+        return mapped
+    
+    def _sync_stat_streams(self, running_ids: List[str]):
+        """Start stats streams for new containers and stop those no longer running"""
+        with self._stream_lock:
+            for container_id in running_ids:
+                self._start_stat_stream(container_id)
+            
+            running = set(running_ids)
+            for container_id in [cid for cid in self._stream_threads if cid not in running]:
+                self._stop_stat_stream(container_id)
+    
+    def _watch_container_events(self):
+        """Events thread: start and stop stats streams as containers come and go"""
+        while True:
+            try:
+                # events() returns once dockerd has accepted the request
+                events = self.api_client.events(decode=True, filters={
+                    'type': 'container', 'event': ['start', 'die']
+                })
+                self._events_subscribed.set()
+                for event in events:
+                    self._handle_container_event(event)
+            except Exception as e:
+                print(f"Docker events stream error: {e}")
+            time.sleep(5)  # Reconnect after dockerd restarts or drops the stream
+    
+    def _handle_container_event(self, event: Dict[str, Any]):
+        """Apply one container start/die event to the stream set and services"""
+        # Actor.ID/Action replace the legacy top-level id/status fields
+        actor = event.get('Actor') or {}
+        container_id = (actor.get('ID') or event['id'])[:12]
+        action = event.get('Action') or event.get('status')
+        
+        if self.auto_register:
+            service_name = f"docker-{(actor.get('Attributes') or {}).get('name', container_id)}"
+            seen = datetime.fromtimestamp(event['time']).isoformat() if 'time' in event \
+                else datetime.now().isoformat()
+            if action == 'start':
+                enqueue_write(SERVICE_STARTED_SQL, [(service_name, seen)])
+            else:
+                enqueue_write(SERVICE_DIED_SQL, [(seen, service_name)])
+        
+        if action == 'die':
+            self._prev_oneshot.pop(container_id, None)
+        
+        if not self.stream_stats:
+            return
+        with self._stream_lock:
+            if action == 'start':
+                self._start_stat_stream(container_id)
+            elif container_id in self._stream_threads:
+                self._stop_stat_stream(container_id)
+    
+    def _start_stat_stream(self, container_id: str):
+        """Start a reader thread unless one is running; caller holds _stream_lock"""
+        if container_id in self._stream_threads:
+            return
+        
+        stop = threading.Event()
+        thread = threading.Thread(target=self._read_stat_stream,
+                                  args=(container_id, stop), daemon=True)
+        self._stream_stops[container_id] = stop
+        self._stream_threads[container_id] = thread
+        thread.start()
+    
+    def _stop_stat_stream(self, container_id: str):
+        """Signal a reader to close its stream; caller holds _stream_lock"""
+        self._stream_stops.pop(container_id).set()
+        self._stream_threads.pop(container_id)
+        self._latest.pop(container_id, None)
+        self._previous.pop(container_id, None)
+        self._prev_oneshot.pop(container_id, None)
+    
+    def _read_stat_stream(self, container_id: str, stop: threading.Event):
+        """Reader thread: keep the newest stats sample for one container"""
+        stream = None
+        try:
+            stream = self.api_client.stats(container_id, stream=True, decode=True)
+            for sample in stream:
+                if stop.is_set():
+                    break
+                with self._stream_lock:
+                    if container_id in self._latest:
+                        self._previous[container_id] = self._latest[container_id]
+                    self._latest[container_id] = sample
+        except Exception as e:
+            print(f"Stats stream for {container_id} ended: {e}")
+        finally:
+            # Closing the generator releases the dockerd connection
+            if stream is not None:
+                stream.close()
+            with self._stream_lock:
+                if self._stream_stops.get(container_id) is stop:
+                    self._stop_stat_stream(container_id)
+    
     def get_container_stats(self, container_id: str) -> Dict[str, Any]:
         """
         Get real-time statistics for a container
         
-        Returns metrics like CPU, memory, network I/O, disk I/O
+        Returns metrics like CPU, memory, network I/O, disk I/O from the
+        container's cached stats stream (see _sync_stat_streams), falling back
+        to a one-shot sample when no streamed sample is available yet
         """
         if not self.client:
             return {}
         
+        with self._stream_lock:
+            stats = self._latest.get(container_id)
+            previous = self._previous.get(container_id)
+        
         try:
-            container = self.client.containers.get(container_id)
-            stats = container.stats(stream=False)
-            
-            # Calculate CPU percentage
-            cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
-                       stats['precpu_stats']['cpu_usage']['total_usage']
-            system_delta = stats['cpu_stats']['system_cpu_usage'] - \
-                          stats['precpu_stats']['system_cpu_usage']
-            cpu_percent = 0.0
-            if system_delta > 0:
-                cpu_percent = (cpu_delta / system_delta) * \
-                             len(stats['cpu_stats']['cpu_usage'].get('percpu_usage', [1])) * 100
-            
-            # Memory stats
-            memory_usage = stats['memory_stats'].get('usage', 0)
-            memory_limit = stats['memory_stats'].get('limit', 1)
-            memory_percent = (memory_usage / memory_limit) * 100 if memory_limit > 0 else 0
-            
-            # Network I/O
-            networks = stats.get('networks', {})
-            rx_bytes = sum(net['rx_bytes'] for net in networks.values())
-            tx_bytes = sum(net['tx_bytes'] for net in networks.values())
-            
-            # Disk I/O
-            blkio_stats = stats.get('blkio_stats', {})
-            io_service_bytes = blkio_stats.get('io_service_bytes_recursive', [])
-            read_bytes = sum(entry['value'] for entry in io_service_bytes 
-                           if entry['op'] == 'Read')
-            write_bytes = sum(entry['value'] for entry in io_service_bytes 
-                            if entry['op'] == 'Write')
-            
-            return {
-                'container_id': container_id,
-                'container_name': container.name,
-                'timestamp': datetime.now().isoformat(),
-                'cpu_percent': round(cpu_percent, 2),
-                'memory_usage_bytes': memory_usage,
-                'memory_limit_bytes': memory_limit,
-                'memory_percent': round(memory_percent, 2),
-                'network_rx_bytes': rx_bytes,
-                'network_tx_bytes': tx_bytes,
-                'disk_read_bytes': read_bytes,
-                'disk_write_bytes': write_bytes,
-                'pids': stats.get('pids_stats', {}).get('current', 0)
-            }
-            
+            if stats is None:
+                stats, previous = self._one_shot_stats(container_id)
+            return self._build_stats(container_id, stats, previous)
         except Exception as e:
             print(f"Error getting stats for {container_id}: {e}")
             return {}
     
+    def _one_shot_stats(self, container_id: str):
+        """Take a raw sample without the engine's 1s averaging (API >= 1.41)"""
+        try:
+            stats = self.api_client.stats(container_id, stream=False, one_shot=True)
+        except InvalidVersion:
+            # Older daemons: the blocking sample carries its own precpu_stats
+            stats = self.api_client.stats(container_id, stream=False)
+            return stats, {'cpu_stats': stats['precpu_stats']}
+        
+        previous = self._prev_oneshot.get(container_id)
+        self._prev_oneshot[container_id] = stats
+        return stats, previous
+    
+    def _build_stats(self, container_id: str, stats: Dict[str, Any],
+                     previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Turn a raw stats sample into metrics, using the previous sample for CPU%"""
+        # Calculate CPU percentage against the previous sample
+        cpu_percent = 0.0
+        if previous:
+            cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
+                       previous['cpu_stats']['cpu_usage']['total_usage']
+            system_delta = stats['cpu_stats'].get('system_cpu_usage', 0) - \
+                          previous['cpu_stats'].get('system_cpu_usage', 0)
+            if system_delta > 0:
+                # percpu_usage is absent on cgroups v2; online_cpus is the
+                # engine's own count (API >= 1.25)
+                ncpu = stats['cpu_stats'].get('online_cpus') or \
+                       len(stats['cpu_stats']['cpu_usage'].get('percpu_usage') or (1,))
+                cpu_percent = (cpu_delta / system_delta) * ncpu * 100
+        
+        # Memory stats
+        memory_usage = stats['memory_stats'].get('usage', 0)
+        memory_limit = stats['memory_stats'].get('limit', 1)
+        memory_percent = (memory_usage / memory_limit) * 100 if memory_limit > 0 else 0
+        
+        # Network I/O
+        rx_bytes = tx_bytes = 0
+        for net in stats.get('networks', {}).values():
+            rx_bytes += net['rx_bytes']
+            tx_bytes += net['tx_bytes']
+        
+        # Disk I/O, read and write totals in one pass
+        blkio_stats = stats.get('blkio_stats') or {}
+        read_bytes = write_bytes = 0
+        for entry in blkio_stats.get('io_service_bytes_recursive') or []:
+            op = entry['op']
+            if op == 'Read':
+                read_bytes += entry['value']
+            elif op == 'Write':
+                write_bytes += entry['value']
+        
+        return {
+            'container_id': container_id,
+            'container_name': stats.get('name', '').lstrip('/'),
+            'timestamp': datetime.now().isoformat(),
+            'cpu_percent': round(cpu_percent, 2),
+            'memory_usage_bytes': memory_usage,
+            'memory_limit_bytes': memory_limit,
+            'memory_percent': round(memory_percent, 2),
+            'network_rx_bytes': rx_bytes,
+            'network_tx_bytes': tx_bytes,
+            'disk_read_bytes': read_bytes,
+            'disk_write_bytes': write_bytes,
+            'pids': stats.get('pids_stats', {}).get('current', 0)
+        }
+    
     def get_container_logs(self, container_id: str, tail=100) -> List[str]:
         """Get recent logs from a container"""
         if not self.client:
@@ -143,8 +463,24 @@ class DockerMonitor:
             print(f"Error getting logs: {e}")
             return []
     
+    def stream_container_logs(self, container_id: str, tail=100) -> Iterator[str]:
+        """Yield recent log lines as they arrive instead of buffering the whole tail"""
+        if not self.client:
+            return
+        
+        try:
+            for chunk in self.api_client.logs(container_id, stream=True, follow=False,
+                                              timestamps=True, tail=tail):
+                yield chunk.decode('utf-8', errors='replace')
+        except Exception as e:
+            print(f"Error streaming logs: {e}")
+    
     def get_system_info(self) -> Dict[str, Any]:
         """Get Docker system information"""
+        return self._cached('system_info', self._get_system_info)
+    
+    def _get_system_info(self) -> Dict[str, Any]:
+        """Query Docker system information (uncached)"""
         if not self.client:
             return {}
         
@@ -188,62 +524,87 @@ class DockerMonitor:
     
     def monitor_all_containers(self) -> List[Dict[str, Any]]:
         """Collect stats from all running containers"""
-        containers = self.discover_containers(include_stopped=False)
-        all_stats = []
+        if self.stream_stats:
+            # The stream cache already tracks every running container
+            with self._stream_lock:
+                streamed = list(self._latest)
+            return [stats for stats in map(self.get_container_stats, streamed) if stats]
+        
+        # Without all=True the engine only lists running containers
+        running = [c['id'] for c in self.discover_containers(include_stopped=False)]
         
-        for container in containers:
-            if container['status'] == 'running':
-                stats = self.get_container_stats(container['id'])
-                if stats:
-                    all_stats.append(stats)
+        collected = [stats for stats in self._pool.map(self.get_container_stats, running) if stats]
         
-        return all_stats
+        # Forget samples of containers that stopped, even without an events thread
+        for container_id in set(self._prev_oneshot) - set(running):
+            self._prev_oneshot.pop(container_id, None)
+        
+        return collected
     
     def register_containers_as_services(self):
         """Auto-register discovered containers as monitored services"""
         containers = self.discover_containers(include_stopped=False)
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        for container in containers:
-            service_name = f"docker-{container['name']}"
-            try:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO services 
-                    (service_name, service_type, status, last_seen)
-                    VALUES (?, ?, ?, ?)
-                ''', (service_name, 'docker_container', 'active', datetime.now().isoformat()))
-            except Exception as e:
-                print(f"Error registering {service_name}: {e}")
-        
-        conn.commit()
-        conn.close()
+        # Upsert, so a service a die event left inactive is reactivated
+        # when its container is running again
+        now = datetime.now().isoformat()
+        enqueue_write(SERVICE_STARTED_SQL, [
+            (f"docker-{container['name']}", now)
+            for container in containers
+        ])
         
         return len(containers)
 
-def init_docker_tables():
-    """Initialize database tables for Docker monitoring"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Append-only time series looked up by (container_id, timestamp): keyed on
+# that pair WITHOUT ROWID, rows are clustered by container and need no index
+CONTAINER_METRICS_DDL = '''
+    CREATE TABLE {table} (
+        container_id TEXT NOT NULL,
+        container_name TEXT NOT NULL,
+        timestamp DATETIME NOT NULL,
+        cpu_percent REAL,
+        memory_usage_bytes INTEGER,
+        memory_percent REAL,
+        network_rx_bytes INTEGER,
+        network_tx_bytes INTEGER,
+        disk_read_bytes INTEGER,
+        disk_write_bytes INTEGER,
+        pids INTEGER,
+        PRIMARY KEY (container_id, timestamp)
+    ) WITHOUT ROWID
+'''
+
+def _migrate_without_rowid(cursor):
+    """Rebuild a legacy rowid container_metrics table into the clustered layout"""
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(container_metrics)')}
+    if 'id' not in columns:
+        return
     
-    # Container metrics table
+    print("Migrating container_metrics to a WITHOUT ROWID table...")
+    cursor.execute('BEGIN')
+    cursor.execute('ALTER TABLE container_metrics RENAME TO container_metrics_legacy')
+    cursor.execute(CONTAINER_METRICS_DDL.format(table='container_metrics'))
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS container_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            container_id TEXT NOT NULL,
-            container_name TEXT NOT NULL,
-            timestamp DATETIME NOT NULL,
-            cpu_percent REAL,
-            memory_usage_bytes INTEGER,
-            memory_percent REAL,
-            network_rx_bytes INTEGER,
-            network_tx_bytes INTEGER,
-            disk_read_bytes INTEGER,
-            disk_write_bytes INTEGER,
-            pids INTEGER
-        )
+        INSERT OR IGNORE INTO container_metrics
+        SELECT container_id, container_name, timestamp, cpu_percent,
+               memory_usage_bytes, memory_percent, network_rx_bytes,
+               network_tx_bytes, disk_read_bytes, disk_write_bytes, pids
+        FROM container_metrics_legacy
     ''')
+    # Drops the old idx_cm_cid_ts along with the table
+    cursor.execute('DROP TABLE container_metrics_legacy')
+    cursor.execute('COMMIT')
+
+def init_docker_tables():
+    """Initialize database tables for Docker monitoring"""
+    with _LOCK:
+        _create_docker_tables(_CONN.cursor())
+
+def _create_docker_tables(cursor):
+    """Run the Docker table DDL"""
+    # Container metrics table
+    cursor.execute(CONTAINER_METRICS_DDL.format(table='IF NOT EXISTS container_metrics'))
+    _migrate_without_rowid(cursor)
     
     # Container registry
     cursor.execute('''
@@ -258,9 +619,6 @@ def init_docker_tables():
             last_seen DATETIME
         )
     ''')
-    
-    conn.commit()
-    conn.close()
 
 # Example usage
 if __name__ == '__main__':
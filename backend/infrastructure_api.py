@@ -1,28 +1,49 @@
 """
 Extended API endpoints for Docker and Kubernetes monitoring
-Add these to app.py to enable container and cluster monitoring
+Add these to app.py to enable container and cluster monitoring; jsonify() there
+serializes through app.py's ORJSONProvider, so large container lists stay cheap
 """
 
-from flask import Flask, jsonify, request
-from docker_monitor import DockerMonitor, init_docker_tables
+from flask import Flask, Response, jsonify, request, stream_with_context
+from docker_monitor import DockerMonitor, init_docker_tables, enqueue_write
 from kubernetes_monitor import KubernetesMonitor, init_kubernetes_tables
-import sqlite3
+import os
 
 # Initialize monitors (add to app.py initialization section)
-docker_monitor = DockerMonitor()
-k8s_monitor = KubernetesMonitor()
+docker_monitor = DockerMonitor(auto_register=True)
+k8s_monitor = KubernetesMonitor(in_cluster=os.environ.get('IN_CLUSTER_K8S') == 'true')
 
 # Initialize tables
 init_docker_tables()
 init_kubernetes_tables()
 
+# Hot collector inserts. Keeping the SQL text constant lets the shared
+# connection's statement cache prepare each one once and reuse it.
+INSERT_CONTAINER_METRICS_SQL = '''
+    INSERT INTO container_metrics 
+    (container_id, container_name, timestamp, cpu_percent, 
+     memory_usage_bytes, memory_percent, network_rx_bytes, 
+     network_tx_bytes, disk_read_bytes, disk_write_bytes, pids)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(container_id, timestamp) DO NOTHING
+'''
+
+INSERT_POD_METRICS_SQL = '''
+    INSERT INTO pod_metrics 
+    (pod_name, namespace, timestamp, phase, ready_containers, 
+     total_containers, restart_count, node_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
 # ==================== DOCKER ENDPOINTS ====================
 
 @app.route('/api/docker/containers', methods=['GET'])
 def get_docker_containers():
     """Get all Docker containers"""
     include_stopped = request.args.get('include_stopped', 'false').lower() == 'true'
-    containers = docker_monitor.discover_containers(include_stopped=include_stopped)
+    label_selector = request.args.get('labels')
+    filters = {'label': label_selector.split(',')} if label_selector else None
+    containers = docker_monitor.discover_containers(include_stopped=include_stopped, filters=filters)
     return jsonify(containers)
 
 @app.route('/api/docker/containers/<container_id>/stats', methods=['GET'])
@@ -35,10 +56,10 @@ def get_container_stats(container_id):
 
 @app.route('/api/docker/containers/<container_id>/logs', methods=['GET'])
 def get_container_logs(container_id):
-    """Get logs from a container"""
+    """Stream logs from a container as plain text, one line at a time"""
     tail = int(request.args.get('tail', 100))
-    logs = docker_monitor.get_container_logs(container_id, tail=tail)
-    return jsonify({'logs': logs})
+    logs = docker_monitor.stream_container_logs(container_id, tail=tail)
+    return Response(stream_with_context(logs), mimetype='text/plain')
 
 @app.route('/api/docker/system', methods=['GET'])
 def get_docker_system():
@@ -183,56 +204,41 @@ def background_infrastructure_collector():
     if docker_monitor.client:
         try:
             container_stats = docker_monitor.monitor_all_containers()
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            for stat in container_stats:
-                cursor.execute('''
-                    INSERT INTO container_metrics 
-                    (container_id, container_name, timestamp, cpu_percent, 
-                     memory_usage_bytes, memory_percent, network_rx_bytes, 
-                     network_tx_bytes, disk_read_bytes, disk_write_bytes, pids)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            rows = [
+                (
                     stat['container_id'], stat['container_name'], 
                     stat['timestamp'], stat['cpu_percent'],
                     stat['memory_usage_bytes'], stat['memory_percent'],
                     stat['network_rx_bytes'], stat['network_tx_bytes'],
                     stat['disk_read_bytes'], stat['disk_write_bytes'],
                     stat['pids']
-                ))
+                )
+                for stat in container_stats
+            ]
             
-            conn.commit()
-            conn.close()
+            # The single writer thread commits the batch with any concurrent writes
+            enqueue_write(INSERT_CONTAINER_METRICS_SQL, rows)
         except Exception as e:
             print(f"Error collecting Docker metrics: {e}")
     
     # Kubernetes pod metrics collection
     if k8s_monitor.core_v1:
         try:
-            for namespace in k8s_monitor.discover_namespaces():
-                pods = k8s_monitor.discover_pods(namespace=namespace)
+            # One cluster-wide listing, so one transaction covers all pod rows,
+            # stamped with a single cycle timestamp
+            timestamp = datetime.now().isoformat()
+            rows = []
+            for pod in k8s_monitor.discover_all_pods():
+                ready_containers = sum(1 for c in pod['container_statuses'] if c['ready'])
+                total_containers = len(pod['container_statuses'])
+                total_restarts = sum(c['restart_count'] for c in pod['container_statuses'])
                 
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                
-                for pod in pods:
-                    ready_containers = sum(1 for c in pod['container_statuses'] if c['ready'])
-                    total_containers = len(pod['container_statuses'])
-                    total_restarts = sum(c['restart_count'] for c in pod['container_statuses'])
-                    
-                    cursor.execute('''
-                        INSERT INTO pod_metrics 
-                        (pod_name, namespace, timestamp, phase, ready_containers, 
-                         total_containers, restart_count, node_name)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        pod['name'], pod['namespace'], datetime.now().isoformat(),
-                        pod['phase'], ready_containers, total_containers,
-                        total_restarts, pod['node_name']
-                    ))
-                
-                conn.commit()
-                conn.close()
+                rows.append((
+                    pod['name'], pod['namespace'], timestamp,
+                    pod['phase'], ready_containers, total_containers,
+                    total_restarts, pod['node_name']
+                ))
+            
+            enqueue_write(INSERT_POD_METRICS_SQL, rows)
         except Exception as e:
-            print(f"Error collecting Kubernetes metrics: {e}")
+            print(f"Error collecting Kubernetes metrics: {e}")
\ No newline at end of file
@@ -3,47 +3,326 @@ Kubernetes Monitoring Module
 Monitors K8s clusters, pods, deployments, services, and nodes
 """
 
-from kubernetes import client, config
+from kubernetes import client, config, dynamic, watch
 from kubernetes.client.rest import ApiException
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator
+from functools import lru_cache
+from operator import itemgetter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import re
+import hashlib
+import json
+import orjson
+import os
+import atexit
+import socket
 import sqlite3
+import subprocess
+import threading
+import time
 
-DB_PATH = 'monitoring.db'
+DB_PATH = os.environ.get('DB_PATH', 'monitoring.db')
+
+# One long-lived connection for pod registration and table setup instead of a
+# connect (and PRAGMA round) per call. Autocommit mode, so batches open an
+# explicit BEGIN inside "with _CONN:"; _LOCK serializes its users.
+_CONN = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+_CONN.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+''')
+_LOCK = threading.RLock()
+
+# Discovery results are served from memory for this long between API calls
+CACHE_TTL_SECONDS = 5
+
+# Ask the apiserver for metadata only (name, namespace, labels, ...) instead
+# of full objects; pods are mostly spec/status by size
+PARTIAL_METADATA_ACCEPT = 'application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1'
+
+# Re-registering a known pod just refreshes last_seen, in the same statement
+REGISTER_POD_SQL = '''
+    INSERT INTO services (service_name, service_type, status, last_seen)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(service_name) DO UPDATE SET last_seen = excluded.last_seen
+'''
+
+# Pod listings are fetched this many items per request (limit/continue), so
+# neither side holds a whole large cluster's JSON at once
+LIST_PAGE_SIZE = 500
+
+# Each watch runs this long before a full relist reconciles any missed events
+WATCH_RECONCILE_SECONDS = 60
+
+# Startup connectivity check results, cached per cluster like kubectl's ~/.kube/cache
+DISCOVERY_CACHE_DIR = os.path.expanduser('~/.cache/cloudwatch-observatory')
+DISCOVERY_TTL_SECONDS = 600
+
+# `kubectl proxy` authenticates once and exposes the apiserver as plain HTTP on loopback
+KUBECTL_PROXY_PORT = 8001
+KUBECTL_PROXY_URL = f'http://127.0.0.1:{KUBECTL_PROXY_PORT}'
+
+# Fetch a raw object's always-present keys in one C-level call instead of one
+# subscript each; optional keys still go through .get() with a default
+_OBJECT_TOP_FIELDS = itemgetter('metadata', 'spec')
+_NAME_NAMESPACE_FIELDS = itemgetter('name', 'namespace')
+_POD_META_FIELDS = itemgetter('name', 'namespace', 'uid')
+_CONTAINER_STATUS_FIELDS = itemgetter('name', 'ready', 'restartCount')
+_CONDITION_FIELDS = itemgetter('type', 'status')
+
+# One label-selector requirement: "k in (a,b)", "k notin (a,b)", "k=v", "k==v", "k!=v", "k", "!k"
+_SELECTOR_RE = re.compile(r'\s*(?:(!)?\s*([\w./-]+)\s*(?:(notin|in)\s*\(([^)]*)\)|(==|=|!=)\s*([\w./-]*))?)\s*(?:,|$)')
+
+@lru_cache(maxsize=128)
+def _compile_selector(selector: str) -> Callable[[Dict[str, str]], bool]:
+    """Parse a label selector once into a predicate over a pod's labels"""
+    matchers = []
+    pos = 0
+    while pos < len(selector):
+        match = _SELECTOR_RE.match(selector, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Invalid label selector: {selector!r}")
+        pos = match.end()
+        negate, key, set_op, values, op, value = match.groups()
+        if negate and (set_op or op):
+            # "!" only applies to bare keys; the apiserver rejects "!k=v" / "!k in (...)"
+            raise ValueError(f"Invalid label selector: {selector!r}")
+        if set_op:
+            allowed = frozenset(v.strip() for v in values.split(','))
+            if set_op == 'in':
+                matchers.append(lambda labels, k=key, a=allowed: labels.get(k) in a)
+            else:
+                matchers.append(lambda labels, k=key, a=allowed: labels.get(k) not in a)
+        elif op == '!=':
+            matchers.append(lambda labels, k=key, v=value: labels.get(k) != v)
+        elif op:
+            matchers.append(lambda labels, k=key, v=value: labels.get(k) == v)
+        elif negate:
+            matchers.append(lambda labels, k=key: k not in labels)
+        else:
+            matchers.append(lambda labels, k=key: k in labels)
+    
+    return lambda labels: all(matcher(labels) for matcher in matchers)
+
+def _ensure_kubectl_proxy(timeout: float = 10.0):
+    """Start `kubectl proxy` unless something already listens on its port"""
+    def listening():
+        try:
+            socket.create_connection(('127.0.0.1', KUBECTL_PROXY_PORT), timeout=0.5).close()
+            return True
+        except OSError:
+            return False
+    
+    if listening():
+        return
+    
+    process = subprocess.Popen(
+        ['kubectl', 'proxy', f'--port={KUBECTL_PROXY_PORT}'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    atexit.register(process.terminate)
+    
+    deadline = time.monotonic() + timeout
+    while not listening():
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f"kubectl proxy did not start on port {KUBECTL_PROXY_PORT}")
+        time.sleep(0.1)
+
+@lru_cache(maxsize=None)
+def _shared_api_client(host: str, use_proxy: bool = False) -> client.ApiClient:
+    """
+    One ApiClient per (apiserver host, proxy mode), so every monitor and API
+    group talking to the same endpoint shares a single urllib3 pool sized for
+    concurrent list calls. Direct clients are built from the default
+    configuration the caller just loaded; proxy clients from a bare
+    configuration pointed at the proxy, leaving the default untouched.
+    ApiClient only builds its async ThreadPool on first async_req call, which
+    this module never makes, so no idle pool threads are spawned here.
+    """
+    if use_proxy:
+        cfg = client.Configuration()
+        cfg.host = host
+    else:
+        cfg = client.Configuration.get_default_copy()
+    cfg.connection_pool_maxsize = (os.cpu_count() or 1) * 5
+    return client.ApiClient(configuration=cfg)
 
 class KubernetesMonitor:
     """Monitor Kubernetes cluster resources"""
     
-    def __init__(self, kubeconfig_path=None, in_cluster=False):
+    def __init__(self, kubeconfig_path=None, in_cluster=False, watch_cache=True, use_proxy=False):
         """
         Initialize Kubernetes client
         
         Args:
             kubeconfig_path: Path to kubeconfig file (default: ~/.kube/config)
             in_cluster: Use in-cluster config (when running inside K8s)
+            watch_cache: Keep pods, nodes and services in memory from watch
+                        streams instead of listing them on every call
+            use_proxy: Talk to the apiserver through a local `kubectl proxy`
+                       (started if needed) so auth/TLS happens once, not per call
         """
+        # key -> {'value': ..., 'expires': monotonic time}
+        self._cache: Dict[Any, Dict[str, Any]] = {}
+        # Shared pool so independent API list calls overlap instead of queueing
+        self._pool = ThreadPoolExecutor(max_workers=16)
+        # kind -> {uid: parsed object}, filled by the watch threads; a kind is
+        # only served from memory once its first full list has landed
+        self._watched: Dict[str, Dict[str, Dict[str, Any]]] = {'pods': {}, 'nodes': {}, 'services': {}}
+        self._watch_synced = {kind: threading.Event() for kind in self._watched}
+        self._watch_lock = threading.RLock()
+        
         try:
-            if in_cluster:
-                config.load_incluster_config()
-                print("✓ Using in-cluster Kubernetes configuration")
+            if use_proxy:
+                _ensure_kubectl_proxy()
+                api_client = _shared_api_client(KUBECTL_PROXY_URL, use_proxy=True)
+                print(f"✓ Using kubectl proxy at {KUBECTL_PROXY_URL}")
             else:
-                config.load_kube_config(config_file=kubeconfig_path)
-                print(f"✓ Loaded kubeconfig: {kubeconfig_path or '~/.kube/config'}")
+                if in_cluster:
+                    config.load_incluster_config()
+                    print("✓ Using in-cluster Kubernetes configuration")
+                else:
+                    config.load_kube_config(config_file=kubeconfig_path)
+                    print(f"✓ Loaded kubeconfig: {kubeconfig_path or '~/.kube/config'}")
+                api_client = _shared_api_client(client.Configuration.get_default_copy().host)
             
-            self.core_v1 = client.CoreV1Api()
-            self.apps_v1 = client.AppsV1Api()
+            self.core_v1 = client.CoreV1Api(api_client)
+            self.apps_v1 = client.AppsV1Api(api_client)
+            self._dynamic = None  # Built lazily: construction runs API discovery
             self.metrics_api = None  # Requires metrics-server
             
-            # Test connection
-            self.core_v1.get_api_resources()
+            # Test connection (skipped while a recent discovery result is on disk)
+            self._cached_discovery(hashlib.sha1(api_client.configuration.host.encode()).hexdigest())
             
         except Exception as e:
             print(f"✗ Failed to initialize Kubernetes client: {e}")
             self.core_v1 = None
             self.apps_v1 = None
+        
+        if self.core_v1 and watch_cache:
+            watched = (
+                ('pods', self.core_v1.list_pod_for_all_namespaces, self._parse_pod),
+                ('nodes', self.core_v1.list_node, self._parse_node),
+                ('services', self.core_v1.list_service_for_all_namespaces, self._parse_service),
+            )
+            for kind, list_func, parse in watched:
+                threading.Thread(target=self._watch_resource, args=(kind, list_func, parse),
+                                 daemon=True).start()
+    
+    def _watch_resource(self, kind: str, list_func, parse):
+        """Watch thread: mirror one resource kind into self._watched[kind]"""
+        while True:
+            try:
+                # Full list (re)seeds the cache: on start, after errors, and
+                # every WATCH_RECONCILE_SECONDS to heal anything a watch missed.
+                # Paged, so only one page of raw JSON is held at a time; every
+                # page comes from the same snapshot, so the final page's
+                # resourceVersion is where the watch resumes
+                seeded = {}
+                for listing in self._iter_pages(list_func):
+                    for obj in listing['items']:
+                        seeded[obj['metadata']['uid']] = parse(obj)
+                    resource_version = listing['metadata']['resourceVersion']
+                with self._watch_lock:
+                    self._watched[kind] = seeded
+                self._watch_synced[kind].set()
+                
+                # deserialize=False (kubernetes>=34.1.0) yields plain JSON events, skipping the model layer
+                for event in watch.Watch().stream(list_func, deserialize=False,
+                                                  resource_version=resource_version,
+                                                  timeout_seconds=WATCH_RECONCILE_SECONDS):
+                    obj = event['object']
+                    if event['type'] == 'ERROR':
+                        break  # Usually 410 Gone: relist from a fresh resourceVersion
+                    with self._watch_lock:
+                        if event['type'] == 'DELETED':
+                            self._watched[kind].pop(obj['metadata']['uid'], None)
+                        elif event['type'] in ('ADDED', 'MODIFIED'):
+                            self._watched[kind][obj['metadata']['uid']] = parse(obj)
+            except Exception as e:
+                print(f"Error watching {kind}: {e}")
+                time.sleep(5)
+    
+    def _list_raw(self, list_func, *args, **kwargs) -> Dict[str, Any]:
+        """Call a list_* API method and decode the raw JSON body with orjson"""
+        response = list_func(*args, watch=False, _preload_content=False, **kwargs)
+        return orjson.loads(response.data)
+    
+    def _iter_pages(self, list_func, *args, page=LIST_PAGE_SIZE, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Yield decoded list responses from a list_* API method, one limit/continue page at a time"""
+        cont = None
+        while True:
+            listing = self._list_raw(list_func, *args, limit=page, _continue=cont, **kwargs)
+            yield listing
+            cont = listing['metadata'].get('continue')
+            if not cont:
+                break
+    
+    def _iter_raw(self, list_func, *args, page=LIST_PAGE_SIZE, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Yield raw items from a list_* API method one limit/continue page at a time"""
+        for listing in self._iter_pages(list_func, *args, page=page, **kwargs):
+            yield from listing['items']
+    
+    def _from_watch(self, kind: str):
+        """Snapshot of a watched kind, or None until its first list has synced"""
+        if not self._watch_synced[kind].is_set():
+            return None
+        with self._watch_lock:
+            return list(self._watched[kind].values())
+    
+    def _cached_discovery(self, cfg_hash: str):
+        """
+        Validate connectivity via get_api_resources(), at most every
+        DISCOVERY_TTL_SECONDS per cluster. A stale cache file is still trusted
+        for this start and refreshed in the background; only a missing one blocks.
+        """
+        path = os.path.join(DISCOVERY_CACHE_DIR, f'discovery-{cfg_hash}.json')
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            self._refresh_discovery(path)
+            return
+        
+        if age >= DISCOVERY_TTL_SECONDS:
+            threading.Thread(target=self._refresh_discovery, args=(path, False), daemon=True).start()
+    
+    def _refresh_discovery(self, path: str, raise_errors=True):
+        """Call get_api_resources() and write the result to the discovery cache"""
+        try:
+            resources = self.core_v1.get_api_resources()
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error refreshing Kubernetes discovery cache: {e}")
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(self.core_v1.api_client.sanitize_for_serialization(resources), f)
+        except OSError as e:
+            print(f"Error writing Kubernetes discovery cache: {e}")
+    
+    def _cached(self, key, loader):
+        """Return loader() from the TTL cache, calling it at most every CACHE_TTL_SECONDS"""
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry and entry['expires'] > now:
+            return entry['value']
+        
+        value = loader()
+        self._cache[key] = {'value': value, 'expires': now + CACHE_TTL_SECONDS}
+        return value
     
     def discover_namespaces(self) -> List[str]:
         """Get all namespaces in the cluster"""
+        return self._cached('namespaces', self._discover_namespaces)
+    
+    def _discover_namespaces(self) -> List[str]:
+        """List namespaces from the API server (uncached)"""
         if not self.core_v1:
             return []
         
@@ -62,80 +341,157 @@ class KubernetesMonitor:
             namespace: Kubernetes namespace
             label_selector: Filter pods by labels (e.g., "app=nginx")
         """
+        # One cached listing per namespace (or the watch cache) serves every
+        # selector; it's applied in-process with a predicate compiled once per string
+        watched = self._from_watch('pods')
+        if watched is not None:
+            pods = [pod for pod in watched if pod['namespace'] == namespace]
+        else:
+            pods = self._cached(('pods', namespace), lambda: self._discover_pods(namespace))
+        if not label_selector:
+            return pods
+        
+        try:
+            selector = _compile_selector(label_selector)
+        except ValueError as e:
+            print(f"Error discovering pods: {e}")
+            return []
+        return [pod for pod in pods if selector(pod['labels'])]
+    
+    def iter_pods(self, namespace=None, page=LIST_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Yield parsed pods page by page, straight from the API
+        
+        Args:
+            namespace: Kubernetes namespace, or None for every namespace
+            page: Pods fetched per list request
+        """
         if not self.core_v1:
+            return
+        
+        if namespace is None:
+            items = self._iter_raw(self.core_v1.list_pod_for_all_namespaces, page=page)
+        else:
+            items = self._iter_raw(self.core_v1.list_namespaced_pod, namespace, page=page)
+        for pod in items:
+            yield self._parse_pod(pod)
+    
+    def _discover_pods(self, namespace: str) -> List[Dict[str, Any]]:
+        """List and parse every pod in a namespace (uncached)"""
+        try:
+            return list(self.iter_pods(namespace))
+        except ApiException as e:
+            print(f"Error discovering pods: {e}")
             return []
+    
+    def discover_pods_for_apps(self, namespace: str, app_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Pods for several apps in one lookup, grouped by their "app" label"""
+        grouped: Dict[str, List[Dict[str, Any]]] = {name: [] for name in app_names}
+        if not app_names:
+            return grouped
         
+        for pod in self.discover_pods(namespace=namespace,
+                                      label_selector=f"app in ({','.join(app_names)})"):
+            grouped[pod['labels']['app']].append(pod)
+        return grouped
+    
+    def discover_all_pods(self) -> List[Dict[str, Any]]:
+        """Discover pods in every namespace with one cluster-wide list call"""
+        watched = self._from_watch('pods')
+        if watched is not None:
+            return watched
+        return self._cached('all_pods', self._discover_all_pods)
+    
+    def _discover_all_pods(self) -> List[Dict[str, Any]]:
+        """List and parse every pod in the cluster (uncached)"""
         try:
-            pods = self.core_v1.list_namespaced_pod(
-                namespace=namespace,
-                label_selector=label_selector
-            )
-            
-            discovered = []
-            for pod in pods.items:
-                # Get container info
-                containers = []
-                for container in pod.spec.containers:
-                    containers.append({
-                        'name': container.name,
-                        'image': container.image,
-                        'ports': [p.container_port for p in (container.ports or [])]
-                    })
-                
-                # Get container statuses
-                container_statuses = []
-                if pod.status.container_statuses:
-                    for status in pod.status.container_statuses:
-                        container_statuses.append({
-                            'name': status.name,
-                            'ready': status.ready,
-                            'restart_count': status.restart_count,
-                            'state': self._get_container_state(status.state)
-                        })
-                
-                pod_info = {
-                    'name': pod.metadata.name,
-                    'namespace': pod.metadata.namespace,
-                    'uid': pod.metadata.uid,
-                    'labels': pod.metadata.labels or {},
-                    'node_name': pod.spec.node_name,
-                    'phase': pod.status.phase,
-                    'pod_ip': pod.status.pod_ip,
-                    'host_ip': pod.status.host_ip,
-                    'start_time': pod.status.start_time.isoformat() if pod.status.start_time else None,
-                    'containers': containers,
-                    'container_statuses': container_statuses,
-                    'conditions': self._get_pod_conditions(pod.status.conditions)
-                }
-                discovered.append(pod_info)
-            
-            return discovered
-            
+            return list(self.iter_pods())
         except ApiException as e:
             print(f"Error discovering pods: {e}")
             return []
     
+    def _parse_pod(self, pod: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw pod JSON object into the pod info dict returned by discovery"""
+        metadata, spec = _OBJECT_TOP_FIELDS(pod)
+        status = pod.get('status', {})
+        name, namespace, uid = _POD_META_FIELDS(metadata)
+        
+        # Get container info
+        containers = []
+        for container in spec['containers']:
+            containers.append({
+                'name': container['name'],
+                'image': container.get('image'),
+                'ports': [p['containerPort'] for p in container.get('ports', ())]
+            })
+        
+        # Get container statuses
+        container_statuses = []
+        for container_status in status.get('containerStatuses', ()):
+            s_name, ready, restart_count = _CONTAINER_STATUS_FIELDS(container_status)
+            container_statuses.append({
+                'name': s_name,
+                'ready': ready,
+                'restart_count': restart_count,
+                'state': self._get_container_state(container_status.get('state', {}))
+            })
+        
+        return {
+            'name': name,
+            'namespace': namespace,
+            'uid': uid,
+            'labels': metadata.get('labels', {}),
+            'node_name': spec.get('nodeName'),
+            'phase': status.get('phase'),
+            'pod_ip': status.get('podIP'),
+            'host_ip': status.get('hostIP'),
+            'start_time': status.get('startTime'),
+            'containers': containers,
+            'container_statuses': container_statuses,
+            'conditions': self._get_pod_conditions(status.get('conditions'))
+        }
+    
+    def _list_partial(self, resource='pods', namespace=None, page=LIST_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """List a core/v1 resource as PartialObjectMetadata, yielding each item's metadata page by page"""
+        if self._dynamic is None:
+            self._dynamic = dynamic.DynamicClient(self.core_v1.api_client)
+        
+        path = f'/api/v1/namespaces/{namespace}/{resource}' if namespace else f'/api/v1/{resource}'
+        cont = None
+        while True:
+            response = self._dynamic.request('GET', path, serialize=False, limit=page, _continue=cont,
+                                             header_params={'Accept': PARTIAL_METADATA_ACCEPT})
+            listing = orjson.loads(response.data)
+            for item in listing['items']:
+                yield item['metadata']
+            cont = listing['metadata'].get('continue')
+            if not cont:
+                break
+    
     def discover_deployments(self, namespace='default') -> List[Dict[str, Any]]:
         """Discover deployments in a namespace"""
         if not self.apps_v1:
             return []
         
         try:
-            deployments = self.apps_v1.list_namespaced_deployment(namespace)
+            deployments = self._list_raw(self.apps_v1.list_namespaced_deployment, namespace)
             
             discovered = []
-            for deploy in deployments.items:
+            for deploy in deployments['items']:
+                metadata, spec = _OBJECT_TOP_FIELDS(deploy)
+                status = deploy.get('status', {})
+                name, namespace = _NAME_NAMESPACE_FIELDS(metadata)
                 deploy_info = {
-                    'name': deploy.metadata.name,
-                    'namespace': deploy.metadata.namespace,
-                    'labels': deploy.metadata.labels or {},
-                    'replicas': deploy.spec.replicas,
-                    'ready_replicas': deploy.status.ready_replicas or 0,
-                    'available_replicas': deploy.status.available_replicas or 0,
-                    'updated_replicas': deploy.status.updated_replicas or 0,
-                    'strategy': deploy.spec.strategy.type,
-                    'selector': deploy.spec.selector.match_labels,
-                    'created': deploy.metadata.creation_timestamp.isoformat()
+                    'name': name,
+                    'namespace': namespace,
+                    'labels': metadata.get('labels', {}),
+                    'replicas': spec.get('replicas'),
+                    'ready_replicas': status.get('readyReplicas', 0),
+                    'available_replicas': status.get('availableReplicas', 0),
+                    'updated_replicas': status.get('updatedReplicas', 0),
+                    'strategy': spec.get('strategy', {}).get('type'),
+                    'selector': spec['selector'].get('matchLabels'),
+                    'created': metadata.get('creationTimestamp')
                 }
                 discovered.append(deploy_info)
             
@@ -147,95 +503,110 @@ class KubernetesMonitor:
     
     def discover_services(self, namespace='default') -> List[Dict[str, Any]]:
         """Discover services in a namespace"""
+        watched = self._from_watch('services')
+        if watched is not None:
+            return [svc for svc in watched if svc['namespace'] == namespace]
+        
         if not self.core_v1:
             return []
         
         try:
-            services = self.core_v1.list_namespaced_service(namespace)
-            
-            discovered = []
-            for svc in services.items:
-                svc_info = {
-                    'name': svc.metadata.name,
-                    'namespace': svc.metadata.namespace,
-                    'type': svc.spec.type,
-                    'cluster_ip': svc.spec.cluster_ip,
-                    'external_ips': svc.spec.external_i_ps or [],
-                    'ports': [
-                        {
-                            'port': p.port,
-                            'target_port': str(p.target_port),
-                            'protocol': p.protocol
-                        }
-                        for p in (svc.spec.ports or [])
-                    ],
-                    'selector': svc.spec.selector or {},
-                    'created': svc.metadata.creation_timestamp.isoformat()
-                }
-                
-                # Get LoadBalancer ingress if available
-                if svc.status.load_balancer and svc.status.load_balancer.ingress:
-                    svc_info['load_balancer'] = [
-                        {'ip': ing.ip, 'hostname': ing.hostname}
-                        for ing in svc.status.load_balancer.ingress
-                    ]
-                
-                discovered.append(svc_info)
-            
-            return discovered
-            
+            services = self._list_raw(self.core_v1.list_namespaced_service, namespace)
+            return [self._parse_service(svc) for svc in services['items']]
         except ApiException as e:
             print(f"Error discovering services: {e}")
             return []
     
+    def _parse_service(self, svc: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw service JSON object into the service info dict returned by discovery"""
+        metadata, spec = _OBJECT_TOP_FIELDS(svc)
+        name, namespace = _NAME_NAMESPACE_FIELDS(metadata)
+        svc_info = {
+            'name': name,
+            'namespace': namespace,
+            'type': spec.get('type'),
+            'cluster_ip': spec.get('clusterIP'),
+            'external_ips': spec.get('externalIPs', []),
+            'ports': [
+                {
+                    'port': p['port'],
+                    'target_port': str(p.get('targetPort')),
+                    'protocol': p.get('protocol')
+                }
+                for p in spec.get('ports', ())
+            ],
+            'selector': spec.get('selector', {}),
+            'created': metadata.get('creationTimestamp')
+        }
+        
+        # Get LoadBalancer ingress if available
+        ingress = svc.get('status', {}).get('loadBalancer', {}).get('ingress')
+        if ingress:
+            svc_info['load_balancer'] = [
+                {'ip': ing.get('ip'), 'hostname': ing.get('hostname')}
+                for ing in ingress
+            ]
+        
+        return svc_info
+    
     def discover_nodes(self) -> List[Dict[str, Any]]:
         """Discover cluster nodes"""
+        watched = self._from_watch('nodes')
+        if watched is not None:
+            return watched
+        
         if not self.core_v1:
             return []
         
         try:
-            nodes = self.core_v1.list_node()
-            
-            discovered = []
-            for node in nodes.items:
-                # Get node conditions
-                conditions = {}
-                if node.status.conditions:
-                    for condition in node.status.conditions:
-                        conditions[condition.type] = condition.status == 'True'
-                
-                # Get resource capacity and allocatable
-                capacity = node.status.capacity or {}
-                allocatable = node.status.allocatable or {}
-                
-                node_info = {
-                    'name': node.metadata.name,
-                    'labels': node.metadata.labels or {},
-                    'ready': conditions.get('Ready', False),
-                    'conditions': conditions,
-                    'capacity': {
-                        'cpu': capacity.get('cpu'),
-                        'memory': capacity.get('memory'),
-                        'pods': capacity.get('pods')
-                    },
-                    'allocatable': {
-                        'cpu': allocatable.get('cpu'),
-                        'memory': allocatable.get('memory'),
-                        'pods': allocatable.get('pods')
-                    },
-                    'os_image': node.status.node_info.os_image,
-                    'kernel_version': node.status.node_info.kernel_version,
-                    'kubelet_version': node.status.node_info.kubelet_version,
-                    'container_runtime': node.status.node_info.container_runtime_version
-                }
-                discovered.append(node_info)
-            
-            return discovered
-            
+            nodes = self._list_raw(self.core_v1.list_node)
+            return [self._parse_node(node) for node in nodes['items']]
         except ApiException as e:
             print(f"Error discovering nodes: {e}")
             return []
     
+    def get_nodes_by_name(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up several nodes at once from a single node listing"""
+        # Field selectors only support =/!=, so there is no "metadata.name in (...)";
+        # filter the one (watch-cached) listing instead of a get per node
+        wanted = set(names)
+        return {node['name']: node for node in self.discover_nodes() if node['name'] in wanted}
+    
+    def _parse_node(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw node JSON object into the node info dict returned by discovery"""
+        metadata, status = node['metadata'], node.get('status', {})
+        node_info = status.get('nodeInfo', {})
+        
+        # Get node conditions
+        conditions = {}
+        for condition_type, condition_status in map(_CONDITION_FIELDS, status.get('conditions', ())):
+            conditions[condition_type] = condition_status == 'True'
+        
+        # Get resource capacity and allocatable
+        capacity = status.get('capacity', {})
+        allocatable = status.get('allocatable', {})
+        
+        return {
+            'name': metadata['name'],
+            'labels': metadata.get('labels', {}),
+            'ready': conditions.get('Ready', False),
+            'conditions': conditions,
+            'capacity': {
+                'cpu': capacity.get('cpu'),
+                'memory': capacity.get('memory'),
+                'pods': capacity.get('pods')
+            },
+            'allocatable': {
+                'cpu': allocatable.get('cpu'),
+                'memory': allocatable.get('memory'),
+                'pods': allocatable.get('pods')
+            },
+            'os_image': node_info.get('osImage'),
+            'kernel_version': node_info.get('kernelVersion'),
+            'kubelet_version': node_info.get('kubeletVersion'),
+            'container_runtime': node_info.get('containerRuntimeVersion')
+        }
+    
     def get_pod_metrics(self, namespace='default') -> List[Dict[str, Any]]:
         """
         Get pod metrics (requires metrics-server installed in cluster)
@@ -250,8 +621,14 @@ class KubernetesMonitor:
             return {}
         
         try:
+            # Every list below is independent, so issue them all at once and
+            # wait for the slowest rather than the sum
+            components_future = self._pool.submit(self.core_v1.list_component_status)
+            nodes_future = self._pool.submit(self.discover_nodes)
+            pods_future = self._pool.submit(self.discover_all_pods)
+            
             # Get component statuses (API server, scheduler, controller-manager, etcd)
-            components = self.core_v1.list_component_status()
+            components = components_future.result()
             
             component_health = {}
             for comp in components.items:
@@ -263,17 +640,16 @@ class KubernetesMonitor:
                 component_health[comp.metadata.name] = healthy
             
             # Count nodes
-            nodes = self.discover_nodes()
+            nodes = nodes_future.result()
             ready_nodes = sum(1 for n in nodes if n['ready'])
             
             # Count pods across all namespaces
-            all_pods = []
-            for ns in self.discover_namespaces():
-                all_pods.extend(self.discover_pods(namespace=ns))
+            all_pods = pods_future.result()
             
-            running_pods = sum(1 for p in all_pods if p['phase'] == 'Running')
-            pending_pods = sum(1 for p in all_pods if p['phase'] == 'Pending')
-            failed_pods = sum(1 for p in all_pods if p['phase'] == 'Failed')
+            phase_counts = Counter(p['phase'] for p in all_pods)
+            running_pods = phase_counts['Running']
+            pending_pods = phase_counts['Pending']
+            failed_pods = phase_counts['Failed']
             
             return {
                 'timestamp': datetime.now().isoformat(),
@@ -313,35 +689,42 @@ class KubernetesMonitor:
     
     def register_pods_as_services(self, namespace='default'):
         """Auto-register discovered pods as monitored services"""
-        pods = self.discover_pods(namespace=namespace)
-        
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        if not self.core_v1:
+            return 0
         
-        for pod in pods:
-            service_name = f"k8s-{namespace}-{pod['name']}"
-            try:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO services 
-                    (service_name, service_type, status, last_seen)
-                    VALUES (?, ?, ?, ?)
-                ''', (service_name, 'kubernetes_pod', 'active', datetime.now().isoformat()))
-            except Exception as e:
-                print(f"Error registering {service_name}: {e}")
+        # Only names are needed, so skip transferring and decoding full pod specs.
+        # Every page is fetched before the write lock is taken, so no other
+        # writer waits on apiserver round trips
+        now = datetime.now().isoformat()
+        prefix = f"k8s-{namespace}-"
+        try:
+            rows = [
+                (prefix + pod['name'], 'kubernetes_pod', 'active', now)
+                for pod in self._list_partial('pods', namespace=namespace)
+            ]
+        except Exception as e:
+            print(f"Error listing pods: {e}")
+            return 0
         
-        conn.commit()
-        conn.close()
+        try:
+            # One transaction, one fsync, for the whole namespace
+            with _LOCK, _CONN:
+                _CONN.execute('BEGIN')
+                _CONN.executemany(REGISTER_POD_SQL, rows)
+        except sqlite3.Error as e:
+            print(f"Error registering pods from {namespace}: {e}")
+            return 0
         
-        return len(pods)
+        return len(rows)
     
-    def _get_container_state(self, state) -> str:
+    def _get_container_state(self, state: Dict[str, Any]) -> str:
         """Extract container state from status"""
-        if state.running:
+        if 'running' in state:
             return 'running'
-        elif state.waiting:
-            return f'waiting: {state.waiting.reason}'
-        elif state.terminated:
-            return f'terminated: {state.terminated.reason}'
+        elif 'waiting' in state:
+            return f"waiting: {state['waiting'].get('reason')}"
+        elif 'terminated' in state:
+            return f"terminated: {state['terminated'].get('reason')}"
         return 'unknown'
     
     def _get_pod_conditions(self, conditions) -> Dict[str, bool]:
@@ -350,15 +733,17 @@ class KubernetesMonitor:
             return {}
         
         return {
-            condition.type: condition.status == 'True'
-            for condition in conditions
+            condition_type: condition_status == 'True'
+            for condition_type, condition_status in map(_CONDITION_FIELDS, conditions)
         }
 
 def init_kubernetes_tables():
     """Initialize database tables for Kubernetes monitoring"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    with _LOCK:
+        _create_kubernetes_tables(_CONN.cursor())
+
+def _create_kubernetes_tables(cursor):
+    """Run the Kubernetes table DDL"""
     # Pod metrics table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS pod_metrics (
@@ -403,8 +788,11 @@ def init_kubernetes_tables():
         )
     ''')
     
-    conn.commit()
-    conn.close()
+    # "Recent samples for pod X" lookups
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_pm_pod_ts
+        ON pod_metrics(pod_name, timestamp)
+    ''')
 
 # Example usage
 if __name__ == '__main__':
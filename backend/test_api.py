@@ -4,30 +4,55 @@ Run with: python test_api.py
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import threading
 
 API_BASE = 'http://localhost:5000/api'
 
+# Upper bound per request, so one hung endpoint can't stall the whole run
+REQUEST_TIMEOUT = 10
+
+# One keep-alive session for the whole suite instead of a new connection per request
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+# Tests run concurrently, so each thread buffers its own output until it finishes
+_output = threading.local()
+
+def emit(line):
+    """Print a line, or buffer it when running inside run_all_tests"""
+    lines = getattr(_output, 'lines', None)
+    if lines is None:
+        print(line)
+    else:
+        lines.append(line)
+
+def _json(response):
+    """Decode a response body with orjson"""
+    return orjson.loads(response.content)
+
 def print_test(name, passed, details=''):
     """Print test result"""
     status = '✓' if passed else '✗'
     color = '\033[92m' if passed else '\033[91m'
     reset = '\033[0m'
-    print(f"{color}{status}{reset} {name}")
+    emit(f"{color}{status}{reset} {name}")
     if details:
-        print(f"  {details}")
+        emit(f"  {details}")
 
 def test_health_summary():
     """Test health summary endpoint"""
-    print("\n[Testing Health Summary Endpoint]")
+    emit("\n[Testing Health Summary Endpoint]")
     
     try:
-        response = requests.get(f"{API_BASE}/health/summary")
+        response = SESSION.get(f"{API_BASE}/health/summary", timeout=REQUEST_TIMEOUT)
         passed = response.status_code == 200
         
         if passed:
-            data = response.json()
+            data = _json(response)
             print_test("GET /api/health/summary", True, f"Found {len(data)} services")
             
             if data:
@@ -43,14 +68,14 @@ def test_health_summary():
 
 def test_anomalies():
     """Test anomalies endpoint"""
-    print("\n[Testing Anomalies Endpoint]")
+    emit("\n[Testing Anomalies Endpoint]")
     
     try:
-        response = requests.get(f"{API_BASE}/health/anomalies?hours=24")
+        response = SESSION.get(f"{API_BASE}/health/anomalies?hours=24", timeout=REQUEST_TIMEOUT)
         passed = response.status_code == 200
         
         if passed:
-            data = response.json()
+            data = _json(response)
             print_test("GET /api/health/anomalies", True, f"Found {len(data)} anomalies")
             
             if data:
@@ -66,21 +91,23 @@ def test_anomalies():
 
 def test_metrics_history():
     """Test metrics history endpoint"""
-    print("\n[Testing Metrics History Endpoint]")
+    emit("\n[Testing Metrics History Endpoint]")
     
     try:
-        response = requests.get(f"{API_BASE}/metrics/history?service=api-gateway&hours=2")
+        response = SESSION.get(f"{API_BASE}/metrics/history?service=api-gateway&hours=2", timeout=REQUEST_TIMEOUT)
         passed = response.status_code == 200
         
         if passed:
-            data = response.json()
-            print_test("GET /api/metrics/history", True, f"Found {len(data)} data points")
+            data = _json(response)
+            points = len(data.get('timestamp', []))
+            print_test("GET /api/metrics/history", True, f"Found {points} data points")
             
-            if data:
-                metric = data[0]
-                required_fields = ['timestamp', 'request_rate', 'error_rate', 'cpu_usage']
-                has_fields = all(field in metric for field in required_fields)
-                print_test("Metrics structure", has_fields, "All required fields present")
+            required_fields = ['timestamp', 'request_rate', 'error_rate', 'cpu_usage']
+            has_fields = all(field in data for field in required_fields)
+            print_test("Metrics structure", has_fields, "All required columns present")
+            
+            same_length = all(len(data[field]) == points for field in required_fields if field in data)
+            print_test("Column lengths", same_length, "All columns have one value per timestamp")
         else:
             print_test("GET /api/metrics/history", False, f"Status: {response.status_code}")
             
@@ -89,14 +116,14 @@ def test_metrics_history():
 
 def test_service_registration():
     """Test service registration endpoint"""
-    print("\n[Testing Service Registration]")
+    emit("\n[Testing Service Registration]")
     
     try:
         payload = {
             'service_name': 'test-service',
             'service_type': 'microservice'
         }
-        response = requests.post(f"{API_BASE}/services/register", json=payload)
+        response = SESSION.post(f"{API_BASE}/services/register", json=payload, timeout=REQUEST_TIMEOUT)
         passed = response.status_code in [200, 400]  # 400 if already exists
         
         print_test("POST /api/services/register", passed, f"Status: {response.status_code}")
@@ -106,14 +133,14 @@ def test_service_registration():
 
 def test_services_list():
     """Test services list endpoint"""
-    print("\n[Testing Services List]")
+    emit("\n[Testing Services List]")
     
     try:
-        response = requests.get(f"{API_BASE}/services")
+        response = SESSION.get(f"{API_BASE}/services", timeout=REQUEST_TIMEOUT)
         passed = response.status_code == 200
         
         if passed:
-            data = response.json()
+            data = _json(response)
             print_test("GET /api/services", True, f"Found {len(data)} registered services")
         else:
             print_test("GET /api/services", False, f"Status: {response.status_code}")
@@ -123,11 +150,11 @@ def test_services_list():
 
 def test_health_scores():
     """Test health score calculations"""
-    print("\n[Testing Health Score Calculations]")
+    emit("\n[Testing Health Score Calculations]")
     
     try:
-        response = requests.get(f"{API_BASE}/health/summary")
-        data = response.json()
+        response = SESSION.get(f"{API_BASE}/health/summary", timeout=REQUEST_TIMEOUT)
+        data = _json(response)
         
         if data:
             for service in data:
@@ -146,18 +173,34 @@ def test_health_scores():
     except Exception as e:
         print_test("Health score validation", False, str(e))
 
+def _run_buffered(test):
+    """Run a test function and return the lines it printed"""
+    _output.lines = []
+    try:
+        test()
+        return _output.lines
+    finally:
+        _output.lines = None
+
 def run_all_tests():
     """Run all API tests"""
     print("═" * 60)
     print("CloudWatch Observatory - API Test Suite")
     print("═" * 60)
     
-    test_services_list()
-    test_service_registration()
-    test_health_summary()
-    test_metrics_history()
-    test_anomalies()
-    test_health_scores()
+    tests = [
+        test_services_list,
+        test_service_registration,
+        test_health_summary,
+        test_metrics_history,
+        test_anomalies,
+        test_health_scores,
+    ]
+    
+    # The tests are independent HTTP probes; run them together and print in order
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for lines in executor.map(_run_buffered, tests):
+            print("\n".join(lines))
     
     print("\n" + "═" * 60)
     print("Test suite complete!")
@@ -168,7 +211,7 @@ if __name__ == '__main__':
     
     print("\nChecking if backend is running...")
     try:
-        response = requests.get(f"{API_BASE}/services", timeout=2)
+        response = SESSION.get(f"{API_BASE}/services", timeout=2)
         print("✓ Backend is accessible\n")
         run_all_tests()
     except requests.exceptions.RequestException:
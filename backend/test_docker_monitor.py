@@ -0,0 +1,120 @@
+"""
+Tests for the Docker monitor's batched writer
+Run with: python -m pytest test_docker_monitor.py
+"""
+
+import os
+import sqlite3
+import tempfile
+
+# docker_monitor opens its writer connection on import; keep it off the real database
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'monitoring.db'))
+
+import docker_monitor
+from docker_monitor import DockerMonitor, _write_batches
+
+def _memory_db():
+    """Autocommit in-memory database with one UNIQUE-keyed table"""
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    conn.execute('CREATE TABLE t (k TEXT UNIQUE NOT NULL, v INTEGER)')
+    return conn
+
+def test_bad_batch_does_not_drop_neighbours():
+    """A failing batch is rolled back alone; batches around it still commit"""
+    conn = _memory_db()
+    insert = 'INSERT INTO t (k, v) VALUES (?, ?)'
+    batches = [
+        (insert, [('a', 1), ('b', 2)]),
+        (insert, [('c', 3), ('c', 4)]),  # UNIQUE violation on its second row
+        (insert, [('d', 5)]),
+    ]
+    
+    dropped = _write_batches(batches, conn)
+    
+    assert dropped == 2
+    assert conn.execute('SELECT k FROM t ORDER BY k').fetchall() == [('a',), ('b',), ('d',)]
+    assert not conn.in_transaction
+
+def test_all_good_batches_commit():
+    """With no failures every row lands and nothing is reported dropped"""
+    conn = _memory_db()
+    insert = 'INSERT INTO t (k, v) VALUES (?, ?)'
+    
+    assert _write_batches([(insert, [('a', 1)]), (insert, [('b', 2)])], conn) == 0
+    assert conn.execute('SELECT COUNT(*) FROM t').fetchone() == (2,)
+
+class _FakeAPIClient:
+    """Stands in for docker.APIClient, returning one /containers/json entry"""
+    
+    def containers(self, all=False, size=False, filters=None):
+        return [{
+            'Id': 'abcdef1234567890',
+            'Names': ['/web'],
+            'Image': 'nginx:latest',
+            'State': 'running',
+            'Status': 'Up 3 minutes',
+            'Created': 1700000000,
+            'Labels': {'app': 'web'},
+            'Ports': [{'PrivatePort': 80, 'PublicPort': 8080, 'Type': 'tcp', 'IP': '0.0.0.0'}],
+            'NetworkSettings': {'Networks': {'bridge': {}}}
+        }]
+
+def _fake_monitor():
+    """DockerMonitor wired to _FakeAPIClient, without connecting to dockerd"""
+    monitor = DockerMonitor.__new__(DockerMonitor)
+    monitor.client = object()
+    monitor.api_client = _FakeAPIClient()
+    monitor.stream_stats = False
+    monitor._cache = {}
+    return monitor
+
+def test_discovered_container_keeps_inspect_shape():
+    """List-endpoint discovery returns the same keys and value shapes as inspect did"""
+    [container] = _fake_monitor()._discover_containers(include_stopped=False)
+    
+    assert container['status'] == 'running'
+    assert container['state']['Status'] == 'running'
+    assert container['state']['Running'] is True
+    assert container['state']['Paused'] is False
+    assert container['created'] == '2023-11-14T22:13:20Z'
+    assert container['ports'] == {'80/tcp': [{'HostIp': '0.0.0.0', 'HostPort': '8080'}]}
+    assert container['networks'] == ['bridge']
+
+def test_registration_reactivates_running_containers(monkeypatch):
+    """A service a die event left inactive is active again after a discovery pass"""
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    conn.execute('''
+        CREATE TABLE services (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            service_name TEXT UNIQUE NOT NULL,
+            service_type TEXT,
+            status TEXT DEFAULT 'active',
+            last_seen DATETIME
+        )
+    ''')
+    conn.execute("INSERT INTO services (service_name, service_type, status) VALUES ('docker-web', 'docker_container', 'inactive')")
+    
+    queued = []
+    monkeypatch.setattr(docker_monitor, 'enqueue_write', lambda sql, rows: queued.append((sql, list(rows))))
+    
+    assert _fake_monitor().register_containers_as_services() == 1
+    _write_batches(queued, conn)
+    
+    assert conn.execute("SELECT status FROM services WHERE service_name = 'docker-web'").fetchone() == ('active',)
+
+def test_oneshot_samples_evicted_for_gone_containers():
+    """Previous one-shot samples are dropped on die events and for containers no longer running"""
+    monitor = _fake_monitor()
+    monitor.auto_register = False
+    monitor._prev_oneshot = {'a' * 12: {}, 'abcdef123456': {}, 'gone00000000': {}}
+    
+    monitor._handle_container_event({'Actor': {'ID': 'a' * 64}, 'Action': 'die'})
+    assert 'a' * 12 not in monitor._prev_oneshot
+    
+    class _InlinePool:
+        map = staticmethod(map)
+    monitor._pool = _InlinePool()
+    monitor.get_container_stats = lambda container_id: {'id': container_id}
+    
+    assert monitor.monitor_all_containers() == [{'id': 'abcdef123456'}]
+    assert set(monitor._prev_oneshot) == {'abcdef123456'}
@@ -0,0 +1,9 @@
+"""
+Cloud Monitoring Platform - WSGI Entrypoint
+Serves the API under gunicorn: gunicorn -w 4 -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from app import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
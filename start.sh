@@ -57,7 +57,9 @@ fi
 # Start backend
 echo -e "\n${BLUE}[4/5]${NC} Starting Flask backend server..."
 echo -e "${YELLOW}Backend will run on http://localhost:5000${NC}"
-python app.py &
+python collector.py &
+COLLECTOR_PID=$!
+gunicorn -w 4 -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app &
 BACKEND_PID=$!
 sleep 3
 
@@ -103,14 +105,14 @@ echo -e "  POST /api/collect/<service_name>"
 echo ""
 echo -e "${BLUE}Useful Commands:${NC}"
 echo -e "  Generate more data:  cd backend && python demo_data.py live 30"
-echo -e "  Stop backend:        kill ${BACKEND_PID}"
+echo -e "  Stop backend:        kill ${BACKEND_PID} ${COLLECTOR_PID}"
 echo -e "  View logs:           cd backend && tail -f app.log"
 echo ""
 echo -e "${YELLOW}Press Ctrl+C to stop the platform${NC}"
 echo ""
 
 # Wait for user interrupt
-trap "echo -e '\n${YELLOW}Shutting down...${NC}'; kill $BACKEND_PID 2>/dev/null; deactivate; exit 0" INT
+trap "echo -e '\n${YELLOW}Shutting down...${NC}'; kill $BACKEND_PID $COLLECTOR_PID 2>/dev/null; deactivate; exit 0" INT
 
 # Keep script running
 wait $BACKEND_PID